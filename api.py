@@ -0,0 +1,198 @@
+#----------------------------------------------------------------------------#
+# JSON API (v1).
+#
+# Endpoints over the same queries as the HTML pages. Lists are
+# keyset paginated (`limit`, `after` -> `next`) and every endpoint accepts
+# `fields=a,b,c` to select only the columns a client needs. Whole tables
+# are streamed from /export/<kind>, and shows are booked in bulk through
+# /shows/batch.
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from werkzeug.exceptions import HTTPException
+
+from cache import page_cache
+from exporter import EXPORTS, FORMATS, dumps, export
+from models import db, Venue, Artist
+from pagination import InvalidCursor
+from queries import (ARTIST_FIELDS, SHOW_FIELDS, SHOW_VIEWS, VENUE_FIELDS,
+                     artist_detail, columns, page_by_id, shows_page, venue_detail)
+from querystats import query_budget
+from routing import replica
+from scheduling import schedule_shows
+from showrows import parse_datetime
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+# fields of a detail payload besides the entity's own columns
+_DETAIL_EXTRA = ('past_shows', 'upcoming_shows')
+
+
+def json_response(payload, status=200):
+  return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def _error(status, message):
+  return json_response({'error': {'status': status, 'message': message}}, status)
+
+
+@api.errorhandler(HTTPException)
+def http_error(e):
+  return _error(e.code, e.description)
+
+
+class BadRequest(ValueError):
+  pass
+
+
+@api.errorhandler(BadRequest)
+def bad_request(e):
+  return _error(400, str(e))
+
+
+@api.errorhandler(InvalidCursor)
+def invalid_cursor(e):
+  return _error(400, 'invalid cursor')
+
+
+def _fields(available, always=()):
+  # the requested field names, in request order, or None for all of them
+  fields = request.args.get('fields')
+  if not fields:
+    return None
+  names = [name.strip() for name in fields.split(',') if name.strip()]
+  unknown = [name for name in names if name not in available]
+  if unknown:
+    raise BadRequest('unknown fields: %s' % ', '.join(unknown))
+  return list(always) + [name for name in names if name not in always]
+
+
+def _limit():
+  limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+  return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def _page(page):
+  # the page must be consumed before next_cursor is known
+  data = [row._asdict() for row in page]
+  return json_response({'data': data, 'next': page.next_cursor})
+
+
+def _list(model, fields):
+  # the id is always selected since it is the page key
+  names = _fields(fields, always=('id',))
+  return _page(page_by_id(model, columns(fields, names), _limit(), after=request.args.get('after')))
+
+
+def _detail(detail, fields):
+  names = _fields(list(fields) + list(_DETAIL_EXTRA))
+  if detail is None:
+    return _error(404, 'Not found')
+  payload = {}
+  for name in names or list(fields) + list(_DETAIL_EXTRA):
+    value = getattr(detail, name)
+    if name in _DETAIL_EXTRA:
+      value = [show._asdict() for show in value]
+    payload[name] = value
+  return json_response(payload)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+@replica
+@query_budget(1)
+def venues():
+  return _list(Venue, VENUE_FIELDS)
+
+@api.route('/venues/<int:venue_id>')
+@replica
+@query_budget(1)
+def venue(venue_id):
+  return _detail(venue_detail(venue_id), VENUE_FIELDS)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+@replica
+@query_budget(1)
+def artists():
+  return _list(Artist, ARTIST_FIELDS)
+
+@api.route('/artists/<int:artist_id>')
+@replica
+@query_budget(1)
+def artist(artist_id):
+  return _detail(artist_detail(artist_id), ARTIST_FIELDS)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+@replica
+@query_budget(1)
+def shows():
+  when = request.args.get('when', 'upcoming')
+  if when not in SHOW_VIEWS:
+    raise BadRequest('when must be one of: %s' % ', '.join(SHOW_VIEWS))
+  # start_time and id are always selected since they are the page key
+  names = _fields(SHOW_FIELDS, always=('id', 'start_time'))
+  selected = columns(SHOW_FIELDS, names)
+  return _page(shows_page(when, _limit(), after=request.args.get('after'), selected=selected))
+
+@api.route('/shows/batch', methods=['POST'])
+def schedule_batch():
+  # books many shows at once; rows overlapping an existing show (or an
+  # earlier row) of the same venue or artist are rejected, the rest are
+  # inserted together, and the response reports on every row
+  payload = request.get_json(silent=True)
+  shows = payload.get('shows') if isinstance(payload, dict) else None
+  if not isinstance(shows, list) or not shows:
+    raise BadRequest('expected a JSON object with a non-empty "shows" list')
+  if len(shows) > current_app.config['SHOW_BATCH_MAX']:
+    raise BadRequest('at most %d shows per batch' % current_app.config['SHOW_BATCH_MAX'])
+
+  result = schedule_shows(shows, current_app.config['SHOW_DURATION'])
+  db.session.commit()
+
+  if result.venue_ids:
+    page_cache.invalidate(
+      'venues', 'shows',
+      *['venue:%d' % id for id in result.venue_ids] + ['artist:%d' % id for id in result.artist_ids])
+
+  created = sum(1 for row in result.results if row['status'] == 'created')
+  return json_response({
+    'created': created,
+    'rejected': len(shows) - created,
+    'results': [dict(row, index=index) for index, row in enumerate(result.results)],
+  }, 201 if created else 200)
+
+
+#  Export
+#  ----------------------------------------------------------------
+
+@api.route('/export/<kind>')
+@replica
+def export_table(kind):
+  # the whole table (or the rows changed since `since`) as CSV or JSONL,
+  # streamed from a server-side cursor while the response is sent
+  if kind not in EXPORTS:
+    return _error(404, 'Not found')
+  format = request.args.get('format', 'jsonl')
+  if format not in FORMATS:
+    raise BadRequest('format must be one of: %s' % ', '.join(FORMATS))
+  since = request.args.get('since')
+  if since:
+    try:
+      since = parse_datetime(since)
+    except (ValueError, OverflowError):
+      raise BadRequest('since must be a timestamp')
+
+  return Response(
+    stream_with_context(export(kind, format, since or None)),
+    mimetype='text/csv' if format == 'csv' else 'application/x-ndjson',
+    headers={'Content-Disposition': 'attachment; filename=%s.%s' % (kind, format)})
@@ -0,0 +1,12 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point: `uvicorn asgi:app`.
+#
+# The read pages of views/asyncpages.py with an async database driver, every
+# other route through the WSGI app. Needs starlette, asyncpg and an ASGI
+# server, which wsgi:app does not (see the README).
+#----------------------------------------------------------------------------#
+
+from app import create_app
+from views.asyncpages import create_asgi_app
+
+app = create_asgi_app(create_app())
@@ -0,0 +1,174 @@
+#----------------------------------------------------------------------------#
+# Static assets.
+#
+# `flask build-assets` joins the stylesheets and scripts of each bundle into
+# one minified file, names every built file after a hash of its content and
+# writes gzip (and brotli, when installed) variants next to it, all under
+# static/dist with a manifest.json. Templates link them through asset_url()
+# and bundle_urls(). A changed file gets a new name, so built files are
+# served with a one-year immutable Cache-Control. Without a build, the
+# helpers fall back to the source files.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from collections import OrderedDict
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+try:
+  import rcssmin
+except ImportError:
+  rcssmin = None
+
+try:
+  import rjsmin
+except ImportError:
+  rjsmin = None
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+# bundle -> source files under static/, in load order. Bundles are written
+# to static/dist, one level below static/ like css/ and js/, so relative
+# url()s in the stylesheets keep pointing at the same files.
+BUNDLES = OrderedDict([
+  ('main.css', ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css', 'css/main.responsive.css',
+                'css/main.quickfix.css']),
+  ('head.js', ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js']),
+  # runs deferred after jQuery, which is loaded from its CDN
+  ('main.js', ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js']),
+])
+
+# single files linked on their own, fingerprinted as they are
+FILES = ['js/libs/jquery-1.11.1.min.js', 'js/libs/respond-1.4.2.min.js', 'img/front-splash.jpg']
+
+COMPRESSED = ('.css', '.js', '.svg', '.json')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+_SOURCE_MAP = re.compile(r'^\s*//[#@] sourceMappingURL=.*$', re.M)
+
+
+def minify_css(text):
+  # rcssmin when installed; otherwise drops comments (keeping /*! notices)
+  # and whitespace that cannot matter. Spaces around ':' stay, they are
+  # significant in selectors.
+  if rcssmin is not None:
+    return rcssmin.cssmin(text, keep_bang_comments=True)
+  text = _CSS_COMMENT.sub('', text)
+  text = _CSS_SPACE.sub(' ', text)
+  text = _CSS_PUNCTUATION.sub(r'\1', text)
+  return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+  # rjsmin when installed; the libraries are shipped minified already, so
+  # without it scripts are only stripped of their source map comments
+  text = _SOURCE_MAP.sub('', text)
+  if rjsmin is not None:
+    return rjsmin.jsmin(text, keep_bang_comments=True)
+  return text.strip()
+
+
+def _read(static, name):
+  with open(os.path.join(static, name), encoding='utf-8') as f:
+    return f.read()
+
+
+def _write(static, name, data):
+  # writes dist/<stem>.<hash><ext> with its compressed variants; returns
+  # the path relative to static/
+  stem, ext = os.path.splitext(name)
+  built = '%s/%s.%s%s' % (DIST, stem, hashlib.sha1(data).hexdigest()[:12], ext)
+  path = os.path.join(static, built)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'wb') as f:
+    f.write(data)
+  if ext in COMPRESSED:
+    variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+      variants.append(('.br', brotli.compress(data)))
+    for suffix, compressed in variants:
+      if len(compressed) < len(data):
+        with open(path + suffix, 'wb') as f:
+          f.write(compressed)
+  return built
+
+
+def build(app):
+  # (re)writes static/dist and its manifest; returns the manifest
+  static = app.static_folder
+  manifest = OrderedDict()
+  for name, sources in BUNDLES.items():
+    if name.endswith('.css'):
+      text = '\n'.join(minify_css(_read(static, source)) for source in sources)
+    else:
+      # `;` guards against a file whose last statement has none
+      text = ';\n'.join(minify_js(_read(static, source)) for source in sources)
+    manifest[name] = _write(static, name, text.encode('utf-8'))
+  for name in FILES:
+    with open(os.path.join(static, name), 'rb') as f:
+      manifest[name] = _write(static, name, f.read())
+  with open(os.path.join(static, DIST, MANIFEST), 'w') as f:
+    json.dump(manifest, f, indent=2)
+  app.extensions['assets'] = manifest
+  return manifest
+
+
+def load_manifest(app):
+  try:
+    with open(os.path.join(app.static_folder, DIST, MANIFEST)) as f:
+      return json.load(f)
+  except FileNotFoundError:
+    return {}
+
+
+def asset_url(name):
+  # URL of a static file, fingerprinted when it was built
+  manifest = current_app.extensions['assets']
+  return url_for('static', filename=manifest.get(name, name))
+
+
+def bundle_urls(name):
+  # the built bundle, or its source files when assets were not built
+  manifest = current_app.extensions['assets']
+  if name in manifest:
+    return [url_for('static', filename=manifest[name])]
+  return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+def send_built(filename):
+  # a built file, precompressed when the client accepts it
+  directory = os.path.join(current_app.static_folder, DIST)
+  mimetype = mimetypes.guess_type(filename)[0]
+  accepted = request.accept_encodings
+  for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+    if accepted[encoding] and os.path.isfile(os.path.join(directory, filename + suffix)):
+      response = send_from_directory(directory, filename + suffix, mimetype=mimetype, conditional=True)
+      response.headers['Content-Encoding'] = encoding
+      break
+  else:
+    response = send_from_directory(directory, filename, mimetype=mimetype, conditional=True)
+  if filename.endswith(COMPRESSED):
+    response.vary.add('Accept-Encoding')
+  response.headers['Cache-Control'] = IMMUTABLE
+  return response
+
+
+def init_app(app):
+  app.extensions['assets'] = load_manifest(app)
+  app.jinja_env.globals.update(asset_url=asset_url, bundle_urls=bundle_urls)
+  # more specific than the /static/<path> rule, so it takes dist/ files
+  app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>', 'assets', send_built)
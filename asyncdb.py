@@ -0,0 +1,115 @@
+#----------------------------------------------------------------------------#
+# Async database access.
+#
+# The ASGI page routes (see views/asyncpages.py) read through asyncpg instead
+# of psycopg2, so a worker goes on serving other requests while Postgres
+# answers, and can send the independent statements of one request at the
+# same time. Statements are the SQLAlchemy queries of queries.py compiled
+# for Postgres; rows come back as named tuples, read like SQLAlchemy's.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import re
+import time
+from collections import namedtuple
+
+import asyncpg
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine.url import make_url
+
+from routing import REPLICA
+
+PRIMARY = 'primary'
+
+# asyncpg takes $1, $2, ...; the numeric paramstyle compiles them as :1, :2, ...
+_dialect = postgresql.dialect(paramstyle='numeric')
+_placeholder_re = re.compile(r'(?<![:\w]):(\d+)')
+_row_classes = {}
+
+
+def compile_statement(query):
+  # (sql, args) of a Query or Core statement; compile inside the app
+  # context the query was built in, then send it from anywhere
+  compiled = getattr(query, 'statement', query).compile(dialect=_dialect)
+  return _placeholder_re.sub(r'$\1', compiled.string), [compiled.params[name] for name in compiled.positiontup]
+
+
+def dsn(uri):
+  # asyncpg's DSN for an SQLAlchemy URL ('postgresql+psycopg2://...')
+  url = make_url(uri)
+  url.drivername = 'postgresql'
+  return str(url)
+
+
+def _rows(records):
+  if not records:
+    return []
+  keys = tuple(records[0].keys())
+  row_class = _row_classes.get(keys)
+  if row_class is None:
+    row_class = _row_classes[keys] = namedtuple('Row', keys, rename=True)
+  return [row_class._make(record) for record in records]
+
+
+class AsyncDatabase(object):
+  # One asyncpg pool per bind (the primary and, when DATABASE_REPLICA_URL is
+  # set, the replica) of up to ASYNC_DB_POOL_SIZE connections, opened by the
+  # first statement sent to it. Pools belong to the event loop they were
+  # opened on: one per process, as under uvicorn.
+
+  def __init__(self, config):
+    self.urls = {PRIMARY: dsn(config['SQLALCHEMY_DATABASE_URI'])}
+    replica = (config.get('SQLALCHEMY_BINDS') or {}).get(REPLICA)
+    if replica:
+      self.urls[REPLICA] = dsn(replica)
+    self.pool_size = config['ASYNC_DB_POOL_SIZE']
+    self.pool_timeout = config['DB_POOL_TIMEOUT']
+
+    self.options = {}
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if config['DB_PGBOUNCER']:
+      # PgBouncer rejects startup parameters and may run the next statement
+      # on another server connection: no prepared statement cache, and the
+      # timeout is enforced by the client
+      self.options['statement_cache_size'] = 0
+      if timeout:
+        self.options['command_timeout'] = timeout / 1000.0
+    elif timeout:
+      self.options['server_settings'] = {'statement_timeout': str(timeout)}
+
+    self._pools = {}
+    self._lock = None
+
+  async def pool(self, bind=PRIMARY):
+    pool = self._pools.get(bind)
+    if pool is None:
+      if self._lock is None:
+        self._lock = asyncio.Lock()
+      async with self._lock:
+        pool = self._pools.get(bind)
+        if pool is None:
+          pool = self._pools[bind] = await asyncpg.create_pool(
+            self.urls[bind], min_size=0, max_size=self.pool_size, **self.options)
+    return pool
+
+  async def fetch(self, statement, bind=PRIMARY, queries=None):
+    # rows of a compile_statement() result; its time is added to `queries`
+    # (a querystats.RequestQueries) like a psycopg2 statement's
+    sql, args = statement
+    pool = await self.pool(bind)
+    async with pool.acquire(timeout=self.pool_timeout) as connection:
+      started = time.perf_counter()
+      records = await connection.fetch(sql, *args)
+      seconds = time.perf_counter() - started
+    if queries is not None:
+      queries.add(sql, seconds)
+    return _rows(records)
+
+  def stats(self):
+    return {bind: {'size': pool.get_size(), 'idle': pool.get_idle_size(), 'max_size': pool.get_max_size()}
+            for bind, pool in self._pools.items()}
+
+  async def close(self):
+    pools, self._pools = self._pools, {}
+    for pool in pools.values():
+      await pool.close()
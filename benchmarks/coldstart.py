@@ -0,0 +1,99 @@
+"""Benchmark time-to-first-response of a fresh worker.
+
+Starts new Python processes against a scratch database and times, in each,
+importing and creating the app and the first GET of every page in
+WARM_UP_URLS, in three setups:
+
+  source    templates compiled from source on first use (no bytecode cache)
+  bytecode  templates loaded from a cache filled by compile_templates()
+  warm      bytecode cache plus warm_up() before the first request
+
+  $ python -m benchmarks.coldstart --database-url postgresql://postgres@localhost:5432/fyyur_bench
+
+The database is migrated to head first; never point this at real data.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ('source', 'bytecode', 'warm')
+
+
+def child(database_url, mode, cache_dir):
+  # runs inside the fresh process; prints one JSON line of timings in ms
+  started = time.perf_counter()
+  from config import get_config
+  class settings(get_config()):
+    SQLALCHEMY_DATABASE_URI = database_url
+    TEMPLATE_CACHE_DIR = cache_dir if mode != 'source' else None
+    PAGE_CACHE_ENABLED = False
+  from app import create_app
+  from warmup import warm_up
+  app = create_app(settings)
+  timings = {'import': (time.perf_counter() - started) * 1000}
+
+  if mode == 'warm':
+    timings['warm_up'] = warm_up(app) * 1000
+  client = app.test_client()
+  for url in app.config['WARM_UP_URLS']:
+    started = time.perf_counter()
+    client.get(url)
+    timings[url] = (time.perf_counter() - started) * 1000
+  print(json.dumps(timings))
+
+
+def run(database_url, mode, cache_dir):
+  output = subprocess.run(
+    [sys.executable, '-W', 'ignore', '-m', 'benchmarks.coldstart', '--database-url', database_url,
+     '--child', mode, '--cache-dir', cache_dir],
+    check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+  return json.loads(output.strip().splitlines()[-1])
+
+
+def median(values):
+  ordered = sorted(values)
+  return ordered[len(ordered) // 2]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--database-url', required=True, help='scratch database to migrate and query')
+  parser.add_argument('--runs', type=int, default=5, help='fresh processes per setup')
+  parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+  parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.child:
+    return child(args.database_url, args.child, args.cache_dir)
+
+  from flask_migrate import upgrade
+  from app import create_app, init_migrate
+  from config import get_config
+  from warmup import compile_templates, template_cache
+  class settings(get_config()):
+    SQLALCHEMY_DATABASE_URI = args.database_url
+  app = create_app(settings)
+  init_migrate(app)
+  with app.app_context():
+    upgrade()
+
+  with tempfile.TemporaryDirectory() as cache_dir:
+    # the ahead-of-time step a deploy runs (`flask compile-templates`)
+    app.jinja_env.bytecode_cache = template_cache(cache_dir)
+    compile_templates(app)
+
+    urls = app.config['WARM_UP_URLS']
+    print('%-9s %9s %9s ' % ('setup', 'import', 'warm-up') + ' '.join('%12s' % url for url in urls) + '   (median ms)')
+    for mode in MODES:
+      runs = [run(args.database_url, mode, cache_dir) for _ in range(args.runs)]
+      columns = [median([timings.get(key, 0) for timings in runs]) for key in ['import', 'warm_up'] + urls]
+      print('%-9s ' % mode + ' '.join('%9.1f' % value for value in columns[:2]) + ' ' +
+            ' '.join('%12.1f' % value for value in columns[2:]))
+
+
+if __name__ == '__main__':
+  main()
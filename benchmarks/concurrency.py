@@ -0,0 +1,256 @@
+"""Compare the WSGI and the ASGI app serving the read pages under concurrency.
+
+At each --concurrency level, every mode runs in a fresh process against a
+database filled by benchmarks.generate, with the same number of database
+connections (--connections): WSGI serves from a thread per request in
+flight (test clients, no HTTP server), ASGI from coroutines on one event
+loop (an in-process httpx client). Reported per mode and level: requests/s,
+p50/p95 latency, peak memory of the process and the requests/s it serves
+per 100 MB of it.
+
+  $ python -m benchmarks.concurrency --database-url postgresql://postgres@localhost:5432/fyyur_bench
+  $ python -m benchmarks.concurrency --database-url ... --concurrency 8 64 256 --latency-ms 2
+
+Requests cycle through the detail pages, /shows (upcoming and past) and the
+searches; the page cache is off, so every request queries. A database on
+the same machine answers in microseconds, which leaves little waiting to
+overlap: --latency-ms routes the connections through a proxy holding every
+packet for half that long each way, like a database across the network.
+Needs starlette, asyncpg and httpx for the ASGI runs.
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.load import percentile, targets
+
+# (method, path, form data), filled in as by benchmarks.load
+ROUTES = [
+  ('GET', '/venues/{venue}', None),
+  ('GET', '/artists/{artist}', None),
+  ('GET', '/shows', None),
+  ('GET', '/shows?when=past', None),
+  ('POST', '/venues/search', {'search_term': '{term}'}),
+  ('POST', '/artists/search', {'search_term': '{term}'}),
+]
+MODES = ('wsgi', 'asgi')
+
+
+class LatencyProxy(threading.Thread):
+  # Forwards TCP connections to Postgres, delivering every chunk `delay`
+  # seconds after it arrived, in order.
+
+  def __init__(self, host, port, delay):
+    super(LatencyProxy, self).__init__(daemon=True)
+    self.host = host
+    self.target_port = port
+    self.delay = delay
+    self.port = None
+    self.ready = threading.Event()
+
+  def run(self):
+    asyncio.run(self.serve())
+
+  async def serve(self):
+    server = await asyncio.start_server(self.connect, '127.0.0.1', 0)
+    self.port = server.sockets[0].getsockname()[1]
+    self.ready.set()
+    async with server:
+      await server.serve_forever()
+
+  async def connect(self, client_reader, client_writer):
+    if self.host.startswith('/'):
+      reader, writer = await asyncio.open_unix_connection('%s/.s.PGSQL.%d' % (self.host, self.target_port))
+    else:
+      reader, writer = await asyncio.open_connection(self.host, self.target_port)
+    await asyncio.gather(self.pipe(client_reader, writer), self.pipe(reader, client_writer))
+
+  async def pipe(self, reader, writer):
+    loop = asyncio.get_running_loop()
+    while True:
+      data = await reader.read(65536)
+      if not data:
+        break
+      loop.call_later(self.delay, writer.write, data)
+    loop.call_later(self.delay, writer.close)
+
+
+def through_proxy(url, latency_ms):
+  # the database URL of a LatencyProxy started in front of `url`
+  from sqlalchemy.engine.url import make_url
+  url = make_url(url)
+  query = dict(url.query)
+  proxy = LatencyProxy(query.pop('host', None) or url.host or 'localhost', url.port or 5432, latency_ms / 2000.0)
+  proxy.start()
+  proxy.ready.wait()
+  url.host, url.port, url.query = '127.0.0.1', proxy.port, query
+  return str(url)
+
+
+def settings_for(args):
+  from config import get_config
+  # production settings, logging to stderr with the slow-request log out of
+  # the way; a subclass, so ProductionConfig itself stays as it is
+  class settings(get_config('production')):
+    SQLALCHEMY_DATABASE_URI = args.database_url
+    SECRET_KEY = 'bench'
+    LOG_FILE = ''
+    SLOW_REQUEST_MS = SLOW_QUERY_MS = 60 * 1000
+    PAGE_CACHE_ENABLED = False
+    WARM_UP = False
+    # the same connections either way; WSGI threads wait for one in the pool
+    DB_POOL_SIZE = ASYNC_DB_POOL_SIZE = args.connections
+    DB_MAX_OVERFLOW = 0
+    DB_POOL_TIMEOUT = 600
+  return settings
+
+
+def requests_of(fill, count):
+  # `count` (method, url, form) requests cycling through ROUTES
+  import re
+  def fill_in(value):
+    return re.sub(r'\{(\w+)\}', lambda match: str(fill[match.group(1)]()), value)
+  for index in range(count):
+    method, path, data = ROUTES[index % len(ROUTES)]
+    yield method, fill_in(path), dict((key, fill_in(value)) for key, value in data.items()) if data else None
+
+
+def drive_wsgi(app, requests, concurrency):
+  # (seconds, latencies in ms, errors) of `requests` sent from `concurrency` threads
+  latencies, errors = [], []
+  lock = threading.Lock()
+  requests = iter(requests)
+
+  def worker():
+    client = app.test_client()
+    while True:
+      with lock:
+        request = next(requests, None)
+      if request is None:
+        return
+      method, url, form = request
+      started = time.perf_counter()
+      response = client.open(url, method=method, data=form)
+      response.get_data()
+      elapsed = (time.perf_counter() - started) * 1000
+      with lock:
+        latencies.append(elapsed)
+        if response.status_code >= 400:
+          errors.append('%s %d' % (url, response.status_code))
+
+  threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+  started = time.perf_counter()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return time.perf_counter() - started, latencies, errors
+
+
+async def drive_asgi(app, requests, concurrency):
+  # (seconds, latencies in ms, errors) of `requests` sent from `concurrency` tasks
+  import httpx
+  latencies, errors = [], []
+  requests = iter(requests)
+
+  async def worker(client):
+    for method, url, form in requests:
+      started = time.perf_counter()
+      response = await client.request(method, url, data=form)
+      latencies.append((time.perf_counter() - started) * 1000)
+      if response.status_code >= 400:
+        errors.append('%s %d' % (url, response.status_code))
+
+  transport = httpx.ASGITransport(app=app)
+  async with httpx.AsyncClient(transport=transport, base_url='http://localhost') as client:
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+    seconds = time.perf_counter() - started
+  return seconds, latencies, errors
+
+
+def child(args):
+  # runs inside the fresh process; prints one JSON line
+  from app import create_app
+  from models import db
+  app = create_app(settings_for(args))
+  with app.app_context():
+    fill = targets(db, args.seed)
+  warm_up = list(requests_of(fill, len(ROUTES) * 2))
+  requests = list(requests_of(fill, args.requests))
+
+  if args.child == 'wsgi':
+    drive_wsgi(app, warm_up, 1)
+    seconds, latencies, errors = drive_wsgi(app, requests, args.concurrency[0])
+  else:
+    from views.asyncpages import create_asgi_app
+    asgi_app = create_asgi_app(app)
+
+    async def run():
+      await drive_asgi(asgi_app, warm_up, 1)
+      result = await drive_asgi(asgi_app, requests, args.concurrency[0])
+      await app.extensions['async_db'].close()
+      return result
+    seconds, latencies, errors = asyncio.run(run())
+
+  print(json.dumps({
+    'rps': len(latencies) / seconds,
+    'p50_ms': percentile(latencies, 0.50),
+    'p95_ms': percentile(latencies, 0.95),
+    # ru_maxrss is in KiB on Linux
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    'errors': errors[:5],
+    'error_count': len(errors),
+  }))
+
+
+def run(args, mode, concurrency):
+  command = [sys.executable, '-W', 'ignore', '-m', 'benchmarks.concurrency', '--child', mode,
+             '--database-url', args.database_url, '--concurrency', str(concurrency),
+             '--connections', str(args.connections), '--requests', str(args.requests), '--seed', str(args.seed)]
+  output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+  return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--database-url', required=True, help='database filled by benchmarks.generate')
+  parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128], help='requests in flight')
+  parser.add_argument('--connections', type=int, default=8, help='database connections per process')
+  parser.add_argument('--requests', type=int, default=600, help='requests per run')
+  parser.add_argument('--latency-ms', type=float, default=0, help='round trip added to every database packet')
+  parser.add_argument('--mode', choices=MODES, nargs='+', default=list(MODES), help='apps to run')
+  parser.add_argument('--seed', type=int, default=42, help='picks the ids and terms requested')
+  parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.child:
+    return child(args)
+
+  if args.latency_ms:
+    args.database_url = through_proxy(args.database_url, args.latency_ms)
+
+  print('%-6s %11s %8s %9s %9s %8s %14s' % (
+    'mode', 'concurrency', 'req/s', 'p50 ms', 'p95 ms', 'RSS MB', 'req/s/100 MB'))
+  failed = False
+  for concurrency in args.concurrency:
+    for mode in args.mode:
+      result = run(args, mode, concurrency)
+      print('%-6s %11d %8.1f %9.2f %9.2f %8.1f %14.1f' % (
+        mode, concurrency, result['rps'], result['p50_ms'], result['p95_ms'], result['peak_rss_mb'],
+        result['rps'] * 100 / result['peak_rss_mb']))
+      if result['error_count']:
+        failed = True
+        print('  %d errors, e.g. %s' % (result['error_count'], ', '.join(result['errors'])), file=sys.stderr)
+  if failed:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,82 @@
+"""Benchmark VenueForm/ArtistForm validation throughput.
+
+Validates synthetic submissions without a database or a running server and
+prints forms per second, building a new form per submission (as the views
+do) and reprocessing a single form (as `flask import` does):
+
+  $ python -m benchmarks.forms --rows 20000
+
+`--distinct-phones` controls how many different phone numbers appear, i.e.
+how often the phone number cache can answer.
+"""
+
+import argparse
+import random
+import time
+
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+GENRES = ['Blues', 'Classical', 'Folk', 'Jazz', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul']
+STATES = ['CA', 'NY', 'IL', 'TX', 'WA', 'TN', 'CO', 'MA', 'OR', 'GA']
+AREA_CODES = ['212', '312', '415', '512', '617', '206', '303', '503', '615', '404']
+
+
+def submissions(rows, distinct_phones, venue):
+  rng = random.Random(42)
+  phones = ['%s-%03d-%04d' % (rng.choice(AREA_CODES), rng.randint(200, 999), rng.randint(0, 9999))
+            for _ in range(distinct_phones)]
+  for i in range(rows):
+    data = MultiDict([
+      ('name', 'Act %d' % i),
+      ('city', 'Springfield'),
+      ('state', rng.choice(STATES)),
+      ('phone', rng.choice(phones)),
+      ('image_link', 'https://img.example.com/%d.jpg' % i),
+      ('facebook_link', 'https://www.facebook.com/act%d' % i),
+      ('website', 'https://act%d.example.com' % i),
+      ('seeking_description', 'Looking for a residency'),
+    ] + [('genres', genre) for genre in rng.sample(GENRES, 3)])
+    if venue:
+      data.add('address', '%d Main St' % i)
+    yield data
+
+
+def run(label, validate, data):
+  started = time.perf_counter()
+  invalid = sum(1 for formdata in data if not validate(formdata))
+  seconds = time.perf_counter() - started
+  print('%-34s %9.0f forms/s %6d invalid' % (label, len(data) / seconds, invalid))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--rows', type=int, default=20000, help='submissions validated per run')
+  parser.add_argument('--distinct-phones', type=int, default=500, help='different phone numbers used')
+  args = parser.parse_args()
+
+  import forms
+  from forms import ArtistForm, VenueForm
+
+  app = Flask(__name__)
+  app.config['SECRET_KEY'] = 'bench'
+  with app.test_request_context():
+    for form_class in (VenueForm, ArtistForm):
+      data = list(submissions(args.rows, args.distinct_phones, form_class is VenueForm))
+      name = form_class.__name__
+
+      forms.normalize_phone.cache_clear()
+      run('%s, new form per row' % name,
+          lambda formdata: form_class(formdata=formdata, meta={'csrf': False}).validate(), data)
+
+      form = form_class(formdata=None, meta={'csrf': False})
+      def reprocess(formdata):
+        form.process(formdata)
+        return form.validate()
+      run('%s, one form reprocessed' % name, reprocess, data)
+
+    print(forms.normalize_phone.cache_info())
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,182 @@
+"""Generate a production-sized synthetic dataset.
+
+Makes N venues, artists and shows from a fixed seed, so every run gets the
+same data (show dates are relative to the day it runs), with skewed
+distributions closer to real traffic than the fixtures:
+
+  * venues and artists cluster in a few big cities, with 1-3 genres each
+  * a few venues and artists get most of the shows (Pareto-distributed)
+  * shows fall on evenings, about two thirds in the past two years and the
+    rest in the coming six months
+
+Rows go through the same validation and bulk insert as `flask import` into a
+migrated scratch database, or are written as fixtures for `flask import`:
+
+  $ python -m benchmarks.generate --database-url postgresql://postgres@localhost:5432/fyyur_bench \\
+      --venues 2000 --artists 5000 --shows 50000
+  $ python -m benchmarks.generate --output-dir /tmp/fyyur-large --shows 50000
+
+The models use Postgres types (ARRAY, TSVECTOR), so the database has to be
+Postgres. Never point this at real data.
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.search import WORDS
+
+# (city, state, weight)
+CITIES = [
+  ('New York', 'NY', 20), ('Los Angeles', 'CA', 14), ('Chicago', 'IL', 10), ('Nashville', 'TN', 8),
+  ('Austin', 'TX', 8), ('San Francisco', 'CA', 7), ('Seattle', 'WA', 6), ('Atlanta', 'GA', 5),
+  ('Denver', 'CO', 4), ('Boston', 'MA', 4), ('Portland', 'OR', 4), ('New Orleans', 'LA', 4),
+  ('Detroit', 'MI', 3), ('Memphis', 'TN', 3), ('Minneapolis', 'MN', 3), ('Phoenix', 'AZ', 2),
+]
+AREA_CODES = ['212', '213', '312', '615', '512', '415', '206', '404', '303', '617', '503', '504', '313', '901', '612', '602']
+VENUE_KINDS = ['Hall', 'Lounge', 'Tavern', 'Club', 'Room', 'Theatre', 'Bar', 'Ballroom', 'Cellar', 'Stage']
+ARTIST_KINDS = ['Band', 'Trio', 'Quartet', 'Collective', 'Ensemble', 'Project', 'Orchestra', 'Sound System']
+STREETS = ['Main St', 'Folsom St', 'Delancey St', 'Broadway', 'Market St', 'Elm St', '2nd Ave', 'Union Ave']
+
+# shows are placed around the start of the current day, so the same seed
+# gives the same past/upcoming split whenever it runs
+TODAY = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _unique_name(rng, kinds, seen):
+  # two words and a kind, numbered when taken, so shows can refer to it by name
+  name = '%s %s %s' % (rng.choice(WORDS).title(), rng.choice(WORDS).title(), rng.choice(kinds))
+  seen[name] = seen.get(name, 0) + 1
+  return name if seen[name] == 1 else '%s %d' % (name, seen[name])
+
+
+def _place(rng):
+  city, state, _ = rng.choices(CITIES, weights=[weight for _, _, weight in CITIES])[0]
+  return city, state
+
+
+def _phone(rng):
+  return '%s-%03d-%04d' % (rng.choice(AREA_CODES), rng.randint(200, 999), rng.randint(0, 9999))
+
+
+def venues(rng, count, genres):
+  seen = {}
+  for i in range(count):
+    city, state = _place(rng)
+    name = _unique_name(rng, VENUE_KINDS, seen)
+    slug = name.lower().replace(' ', '')
+    yield {
+      'name': name, 'city': city, 'state': state,
+      'address': '%d %s' % (rng.randint(1, 2500), rng.choice(STREETS)),
+      'phone': _phone(rng),
+      'genres': rng.sample(genres, rng.choice((1, 1, 2, 2, 3))),
+      'image_link': 'https://images.example.com/venues/%d.jpg' % i,
+      'facebook_link': 'https://www.facebook.com/%s' % slug,
+      'website': 'https://%s.example.com' % slug,
+      'seeking_talent': rng.random() < 0.3,
+      'seeking_description': 'Looking for %s acts' % rng.choice(genres).lower() if rng.random() < 0.3 else '',
+    }
+
+
+def artists(rng, count, genres):
+  seen = {}
+  for i in range(count):
+    city, state = _place(rng)
+    name = _unique_name(rng, ARTIST_KINDS, seen)
+    slug = name.lower().replace(' ', '')
+    yield {
+      'name': name, 'city': city, 'state': state,
+      'phone': _phone(rng),
+      'genres': rng.sample(genres, rng.choice((1, 2, 2, 3))),
+      'image_link': 'https://images.example.com/artists/%d.jpg' % i,
+      'facebook_link': 'https://www.facebook.com/%s' % slug,
+      'website': 'https://%s.example.com' % slug if rng.random() < 0.6 else '',
+      'seeking_venue': rng.random() < 0.4,
+      'seeking_description': 'Touring this year' if rng.random() < 0.4 else '',
+    }
+
+
+def _popularity(rng, count):
+  # cumulative Pareto weights: a few entities get most of the shows
+  total, cumulative = 0.0, []
+  for _ in range(count):
+    total += rng.paretovariate(1.2)
+    cumulative.append(total)
+  return cumulative
+
+
+def shows(rng, count, venue_names, artist_names):
+  venue_weights = _popularity(rng, len(venue_names))
+  artist_weights = _popularity(rng, len(artist_names))
+  for _ in range(count):
+    day = rng.randint(-730, -1) if rng.random() < 0.67 else rng.randint(0, 182)
+    start = TODAY + timedelta(days=day, hours=rng.choice((18, 19, 20, 20, 21, 21, 22)), minutes=rng.choice((0, 0, 30)))
+    yield {
+      'venue_name': rng.choices(venue_names, cum_weights=venue_weights)[0],
+      'artist_name': rng.choices(artist_names, cum_weights=artist_weights)[0],
+      'start_time': start.isoformat(),
+    }
+
+
+def generate(seed, venue_count, artist_count, show_count):
+  # {kind: [row, ...]} in `flask import` format
+  from forms import genre_choices
+  genres = [value for value, _ in genre_choices]
+  rng = random.Random(seed)
+  data = {'venues': list(venues(rng, venue_count, genres)), 'artists': list(artists(rng, artist_count, genres))}
+  data['shows'] = list(shows(rng, show_count, [row['name'] for row in data['venues']],
+                             [row['name'] for row in data['artists']]))
+  return data
+
+
+def write_fixtures(data, directory):
+  os.makedirs(directory, exist_ok=True)
+  for kind, rows in data.items():
+    with open(os.path.join(directory, kind + '.jsonl'), 'w') as f:
+      for row in rows:
+        f.write(json.dumps(row) + '\n')
+
+
+def load(data, database_url):
+  # migrates the database and imports the rows; returns {kind: ImportResult}
+  from flask_migrate import upgrade
+  from app import create_app, init_migrate
+  from config import get_config
+  from importer import import_rows
+  class settings(get_config()):
+    SQLALCHEMY_DATABASE_URI = database_url
+  app = create_app(settings)
+  init_migrate(app)
+  results = {}
+  with app.app_context():
+    upgrade()
+    for kind in ('venues', 'artists', 'shows'):
+      results[kind] = import_rows(kind, enumerate(data[kind], 1))
+  return results
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--database-url', help='scratch database to migrate and fill')
+  parser.add_argument('--output-dir', help='write venues/artists/shows.jsonl here instead')
+  parser.add_argument('--venues', type=int, default=2000)
+  parser.add_argument('--artists', type=int, default=5000)
+  parser.add_argument('--shows', type=int, default=50000)
+  parser.add_argument('--seed', type=int, default=42)
+  args = parser.parse_args()
+  if not args.database_url and not args.output_dir:
+    parser.error('give --database-url or --output-dir')
+
+  data = generate(args.seed, args.venues, args.artists, args.shows)
+  if args.output_dir:
+    write_fixtures(data, args.output_dir)
+    print('wrote %s' % ', '.join('%d %s' % (len(rows), kind) for kind, rows in data.items()))
+  if args.database_url:
+    for kind, result in load(data, args.database_url).items():
+      print('%-8s %7d imported %5d rejected %6.1fs' % (kind, result.imported, result.rejected, result.seconds))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,270 @@
+"""Load-test every read route of the app and compare against a baseline.
+
+Drives each route in turn from --concurrency threads, each with its own test
+client (no HTTP server), against a database filled by benchmarks.generate,
+and reports per route: requests/s, p50/p95/p99 latency and the SQL
+statements per request (read from the Server-Timing header):
+
+  $ python -m benchmarks.generate --database-url postgresql://postgres@localhost:5432/fyyur_bench
+  $ python -m benchmarks.load --database-url postgresql://postgres@localhost:5432/fyyur_bench \\
+      --save benchmarks/baselines/load.json
+  $ python -m benchmarks.load --database-url ... --compare benchmarks/baselines/load.json
+
+With --compare, a route whose p95 is more than --tolerance (and --min-ms)
+slower than the baseline, or which runs more statements, is marked and the
+exit status is 1.
+Latency depends on the machine, so compare runs from the same one; the
+statement counts hold everywhere (a streamed response, like the export,
+reports none: its statements run after the header is sent). The page cache
+is off unless --page-cache is given, so every request does the route's real
+work.
+
+Routes that write (form submissions, DELETE, the batch API) and the
+thumbnail proxy (which fetches remote images) are left out; any other route
+not listed in ROUTES is reported, so new routes get added here.
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# endpoint -> (method, path, form data); '{venue}', '{artist}', '{term}' and
+# '{prefix}' are filled in per request from the database
+ROUTES = [
+  ('main.index', 'GET', '/', None),
+  ('venues.venues', 'GET', '/venues', None),
+  ('venues.show_venue', 'GET', '/venues/{venue}', None),
+  ('venues.search_venues', 'POST', '/venues/search', {'search_term': '{term}'}),
+  ('artists.artists', 'GET', '/artists', None),
+  ('artists.show_artist', 'GET', '/artists/{artist}', None),
+  ('artists.search_artists', 'POST', '/artists/search', {'search_term': '{term}'}),
+  ('shows.shows', 'GET', '/shows', None),
+  ('shows.shows:past', 'GET', '/shows?when=past', None),
+  ('main.search_suggest', 'GET', '/search/suggest?q={prefix}', None),
+  ('venues.create_venue_form', 'GET', '/venues/create', None),
+  ('venues.edit_venue', 'GET', '/venues/{venue}/edit', None),
+  ('artists.create_artist_form', 'GET', '/artists/create', None),
+  ('artists.edit_artist', 'GET', '/artists/{artist}/edit', None),
+  ('shows.create_shows', 'GET', '/shows/create', None),
+  ('api_v1.venues', 'GET', '/api/v1/venues', None),
+  ('api_v1.venue', 'GET', '/api/v1/venues/{venue}', None),
+  ('api_v1.artists', 'GET', '/api/v1/artists', None),
+  ('api_v1.artist', 'GET', '/api/v1/artists/{artist}', None),
+  ('api_v1.shows', 'GET', '/api/v1/shows', None),
+  ('api_v1.export_table', 'GET', '/api/v1/export/venues', None),
+  ('main.cache_stats', 'GET', '/_stats/cache', None),
+  ('main.pool_stats_view', 'GET', '/_stats/pool', None),
+  ('metrics', 'GET', '/metrics', None),
+]
+
+SKIPPED = {
+  'static', 'assets', 'thumbnail', 'api_v1.schedule_batch',
+  'venues.create_venue_submission', 'venues.edit_venue_submission', 'venues.delete_venue',
+  'artists.create_artist_submission', 'artists.edit_artist_submission', 'shows.create_show_submission',
+}
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(samples, fraction):
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def uncovered(app):
+  endpoints = set(rule.endpoint for rule in app.url_map.iter_rules())
+  return sorted(endpoints - SKIPPED - set(name.split(':')[0] for name, _, _, _ in ROUTES))
+
+
+def targets(db, seed):
+  # ids and search terms drawn from the data, the same for every run
+  from sqlalchemy import text
+  rng = random.Random(seed)
+  venues = [id for (id,) in db.session.execute(text('SELECT id FROM "Venue" ORDER BY id'))]
+  artists = [id for (id,) in db.session.execute(text('SELECT id FROM "Artist" ORDER BY id'))]
+  names = [name for (name,) in db.session.execute(text('SELECT name FROM "Venue" ORDER BY id LIMIT 500'))]
+  if not venues or not artists:
+    sys.exit('The database is empty, fill it with benchmarks.generate first.')
+  words = sorted(set(word.lower() for name in names for word in name.split() if not word.isdigit()))
+  return {
+    'venue': lambda: rng.choice(venues),
+    'artist': lambda: rng.choice(artists),
+    'term': lambda: rng.choice(words),
+    'prefix': lambda: rng.choice(words)[:3],
+  }
+
+
+def drive(app, method, path, data, fill, requests, concurrency):
+  # runs `requests` requests from `concurrency` threads; returns
+  # (seconds, latencies in ms, statements per request, errors)
+  latencies, queries, errors = [], [], []
+  lock = threading.Lock()
+  remaining = [requests]
+
+  def fill_in(value):
+    return re.sub(r'\{(\w+)\}', lambda match: str(fill[match.group(1)]()), value)
+
+  def worker():
+    client = app.test_client()
+    while True:
+      with lock:
+        if not remaining[0]:
+          return
+        remaining[0] -= 1
+        url = fill_in(path)
+        form = dict((key, fill_in(value)) for key, value in data.items()) if data else None
+      started = time.perf_counter()
+      try:
+        response = client.open(url, method=method, data=form)
+        response.get_data()
+      except Exception as e:
+        with lock:
+          errors.append('%s %r' % (url, e))
+        continue
+      elapsed = (time.perf_counter() - started) * 1000
+      match = _QUERIES.search(response.headers.get('Server-Timing', ''))
+      with lock:
+        latencies.append(elapsed)
+        if match:
+          queries.append(int(match.group(1)))
+        if response.status_code >= 400:
+          errors.append('%s %d' % (url, response.status_code))
+
+  threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+  started = time.perf_counter()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return time.perf_counter() - started, latencies, queries, errors
+
+
+def run(app, fill, requests, concurrency):
+  results = {}
+  for name, method, path, data in ROUTES:
+    drive(app, method, path, data, fill, min(requests, 10), 1)
+    seconds, latencies, queries, errors = drive(app, method, path, data, fill, requests, concurrency)
+    if errors:
+      print('%s: %d errors, e.g. %s' % (name, len(errors), errors[0]), file=sys.stderr)
+    if not latencies:
+      continue
+    results[name] = {
+      'rps': round(len(latencies) / seconds, 1),
+      'p50_ms': round(percentile(latencies, 0.50), 2),
+      'p95_ms': round(percentile(latencies, 0.95), 2),
+      'p99_ms': round(percentile(latencies, 0.99), 2),
+      'queries': percentile(queries, 0.5) if queries else None,
+      'errors': len(errors),
+    }
+  return results
+
+
+def regressions(name, result, baseline, tolerance, min_ms):
+  # reasons `result` is worse than the baseline entry for the same route
+  before = baseline.get(name)
+  if before is None:
+    return []
+  reasons = []
+  slower = result['p95_ms'] - before['p95_ms']
+  if before['p95_ms'] and slower > before['p95_ms'] * tolerance and slower > min_ms:
+    reasons.append('p95 +%.0f%%' % ((result['p95_ms'] / before['p95_ms'] - 1) * 100))
+  if before['queries'] is not None and result['queries'] is not None and result['queries'] > before['queries']:
+    reasons.append('queries %d -> %d' % (before['queries'], result['queries']))
+  if result['errors'] > before.get('errors', 0):
+    reasons.append('errors')
+  return reasons
+
+
+def report(results, baseline, tolerance, min_ms):
+  # prints the table; returns the number of regressed routes
+  print('%-28s %8s %9s %9s %9s %8s  %s' % ('route', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries',
+                                          'vs baseline' if baseline else ''))
+  regressed = 0
+  for name, result in results.items():
+    line = '%-28s %8.1f %9.2f %9.2f %9.2f %8s' % (
+      name, result['rps'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+      '-' if result['queries'] is None else result['queries'])
+    if baseline:
+      before = baseline.get(name)
+      reasons = regressions(name, result, baseline, tolerance, min_ms)
+      regressed += bool(reasons)
+      if before is None:
+        line += '  new'
+      else:
+        line += '  p95 %+.0f%%%s' % ((result['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0,
+                                    '  REGRESSED: ' + ', '.join(reasons) if reasons else '')
+    print(line)
+  return regressed
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--database-url', required=True, help='database filled by benchmarks.generate')
+  parser.add_argument('--requests', type=int, default=200, help='requests per route')
+  parser.add_argument('--concurrency', type=int, default=8, help='threads sending requests')
+  parser.add_argument('--seed', type=int, default=42, help='picks the ids and terms requested')
+  parser.add_argument('--page-cache', action='store_true', help='keep the page cache on')
+  parser.add_argument('--save', metavar='PATH', help='store the results as a baseline')
+  parser.add_argument('--compare', metavar='PATH', help='baseline to compare against')
+  parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown (0.25 = 25%%)')
+  parser.add_argument('--min-ms', type=float, default=5, help='p95 slowdowns up to this many ms are noise')
+  args = parser.parse_args()
+
+  from config import get_config
+
+  # production settings (no debug template reloading), logging to stderr
+  # with the slow-request log out of the way; a subclass, so ProductionConfig
+  # itself stays as it is for anything else in this process
+  class settings(get_config('production')):
+    SQLALCHEMY_DATABASE_URI = args.database_url
+    SECRET_KEY = 'bench'
+    LOG_FILE = ''
+    SLOW_REQUEST_MS = SLOW_QUERY_MS = 60 * 1000
+    SERVER_TIMING = True
+    PAGE_CACHE_ENABLED = args.page_cache
+    # a connection per thread, so the pool is not what is measured
+    DB_POOL_SIZE = args.concurrency
+    DB_MAX_OVERFLOW = 0
+
+  from app import create_app
+  from models import db
+  app = create_app(settings)
+
+  missing = uncovered(app)
+  if missing:
+    print('not benchmarked (add them to ROUTES or SKIPPED): %s' % ', '.join(missing), file=sys.stderr)
+
+  with app.app_context():
+    fill = targets(db, args.seed)
+  results = run(app, fill, args.requests, args.concurrency)
+
+  baseline = None
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)['routes']
+  regressed = report(results, baseline, args.tolerance, args.min_ms)
+
+  if args.save:
+    with open(args.save, 'w') as f:
+      json.dump({
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'page_cache': args.page_cache,
+        'routes': results,
+      }, f, indent=2)
+      f.write('\n')
+  if regressed:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,64 @@
+"""Benchmark rendering the /shows page.
+
+Renders pages/shows.html with synthetic shows (10k by default) straight
+through Jinja, without a database, and times the page as a whole and the
+datetime filter on its own:
+
+  $ python -m benchmarks.render --shows 10000
+"""
+
+import argparse
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+ShowRow = namedtuple('ShowRow', ['id', 'venue_id', 'venue_name', 'venue_image_link',
+                                 'artist_id', 'artist_name', 'artist_image_link', 'start_time'])
+
+
+class Page(list):
+  # stands in for a KeysetPage holding every show
+  next_cursor = None
+
+
+def shows(count):
+  start = datetime(2030, 1, 1, 20, tzinfo=timezone.utc)
+  return Page(
+    ShowRow(i, i % 500, 'Venue %d' % (i % 500), 'https://img.example.com/v.jpg',
+            i % 900, 'Artist %d' % (i % 900), 'https://img.example.com/a.jpg',
+            start + timedelta(minutes=37 * i))
+    for i in range(count))
+
+
+def best_of(repeat, function):
+  timings = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    function()
+    timings.append(time.perf_counter() - started)
+  return min(timings) * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--shows', type=int, default=10000, help='shows on the page')
+  parser.add_argument('--repeat', type=int, default=5, help='timed runs, the best is reported')
+  args = parser.parse_args()
+
+  from flask import render_template
+  from app import create_app
+  app = create_app()
+
+  page = shows(args.shows)
+  format_datetime = app.jinja_env.filters['datetime_fmt']
+  with app.test_request_context('/shows'):
+    render_template('pages/shows.html', shows=page, when='all', limit=args.shows)
+    page_ms = best_of(args.repeat, lambda: render_template('pages/shows.html', shows=page, when='all', limit=args.shows))
+    filter_ms = best_of(args.repeat, lambda: [format_datetime(show.start_time, 'full') for show in page])
+
+  print('%d shows: page %.1f ms, datetime filter alone %.1f ms (%.2f us/call)' % (
+    args.shows, page_ms, filter_ms, filter_ms * 1000 / args.shows))
+
+
+if __name__ == '__main__':
+  main()
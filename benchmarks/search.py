@@ -0,0 +1,106 @@
+"""Benchmark the venue/artist full-text search.
+
+Seeds a scratch database with synthetic venues and artists (100k of each by
+default) and times ranked_search() for a handful of terms:
+
+  $ python -m benchmarks.search --database-url postgresql://postgres@localhost:5432/fyyur_bench
+
+The database is migrated to head first; never point this at real data.
+"""
+
+import argparse
+import time
+
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+WORDS = [
+  'amber', 'anchor', 'atlas', 'barrel', 'basement', 'beacon', 'birch', 'blue', 'bridge', 'brass',
+  'canyon', 'cedar', 'cellar', 'copper', 'corner', 'crown', 'delta', 'dock', 'echo', 'ember',
+  'fable', 'falcon', 'fern', 'forge', 'garden', 'gold', 'granite', 'grove', 'hall', 'harbor',
+  'hollow', 'house', 'iris', 'ivory', 'jade', 'jukebox', 'juniper', 'lantern', 'lark', 'lounge',
+  'maple', 'meadow', 'mill', 'moon', 'north', 'oak', 'orchid', 'parlor', 'pier', 'quarry',
+  'raven', 'river', 'rust', 'sable', 'signal', 'stage', 'summit', 'tavern', 'union', 'velvet',
+]
+CITIES = [
+  'San Francisco', 'New York', 'Chicago', 'Austin', 'Seattle', 'Nashville', 'Denver', 'Boston',
+  'Portland', 'Atlanta', 'Detroit', 'Memphis', 'Oakland', 'Brooklyn', 'Phoenix', 'Miami',
+]
+STATES = ['CA', 'NY', 'IL', 'TX', 'WA', 'TN', 'CO', 'MA', 'OR', 'GA', 'MI', 'TN', 'CA', 'NY', 'AZ', 'FL']
+GENRES = [
+  'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop', 'Heavy Metal',
+  'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+]
+TERMS = ['jazz', 'velvet lantern', 'san fran', 'copper', 'tav', 'oak 4711', 'nothing matches this']
+
+SEED_SQL = '''
+SELECT setseed(0.42);
+INSERT INTO "{table}" (name, city, state, genres, seeking_description)
+SELECT
+  initcap(w[1 + floor(random() * {words})::int] || ' ' || w[1 + floor(random() * {words})::int]) || ' ' || i,
+  c[1 + (i % {cities})],
+  s[1 + (i % {cities})],
+  ARRAY[g[1 + floor(random() * {genres})::int], g[1 + floor(random() * {genres})::int]],
+  'Looking for ' || w[1 + floor(random() * {words})::int] || ' acts'
+FROM generate_series(1, :rows) i,
+  (SELECT CAST(:words_list AS text[]) w, CAST(:cities_list AS text[]) c,
+          CAST(:states_list AS text[]) s, CAST(:genres_list AS text[]) g) lists;
+'''
+
+
+def seed(db, table, rows):
+  existing = db.session.execute(text('SELECT count(*) FROM "%s"' % table)).scalar()
+  if existing >= rows:
+    return
+  sql = SEED_SQL.format(table=table, words=len(WORDS), cities=len(CITIES), genres=len(GENRES))
+  db.session.execute(text(sql), {
+    'rows': rows - existing,
+    'words_list': WORDS, 'cities_list': CITIES, 'states_list': STATES, 'genres_list': GENRES,
+  })
+  db.session.commit()
+  # flush the GIN pending list and refresh statistics, as autovacuum would
+  with db.engine.connect() as connection:
+    connection.execution_options(isolation_level='AUTOCOMMIT').execute('VACUUM ANALYZE "%s"' % table)
+
+
+def percentile(samples, fraction):
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--database-url', required=True, help='scratch database to seed and query')
+  parser.add_argument('--rows', type=int, default=100000, help='venues and artists to seed (each)')
+  parser.add_argument('--repeat', type=int, default=50, help='timed runs per term')
+  parser.add_argument('--limit', type=int, default=50, help='search result limit')
+  args = parser.parse_args()
+
+  from app import create_app, init_migrate
+  from config import get_config
+  from models import db, Venue, Artist
+  from search import ranked_search
+  class settings(get_config()):
+    SQLALCHEMY_DATABASE_URI = args.database_url
+  app = create_app(settings)
+  init_migrate(app)
+
+  with app.app_context():
+    upgrade()
+    for model in (Venue, Artist):
+      seed(db, model.__tablename__, args.rows)
+
+    print('%-8s %-22s %7s %9s %9s' % ('model', 'term', 'total', 'p50 ms', 'p95 ms'))
+    for model in (Venue, Artist):
+      for term in TERMS:
+        samples = []
+        for _ in range(args.repeat):
+          started = time.perf_counter()
+          rows, total = ranked_search(db.session.query(model.id, model.name), model, term, args.limit)
+          samples.append((time.perf_counter() - started) * 1000)
+        total = '%d+' % args.limit if total > args.limit else total
+        print('%-8s %-22s %7s %9.2f %9.2f' % (model.__tablename__, term, total, percentile(samples, 0.5), percentile(samples, 0.95)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,108 @@
+"""Benchmark worker startup: importing the app, create_app() and a first request.
+
+Times, in fresh Python processes, `import app`, `create_app()` and the first
+GET of the home page, which needs no database, and reports the process's
+peak memory and module count after startup:
+
+  $ python -m benchmarks.startup --runs 10
+  $ python -m benchmarks.startup --importtime 15
+
+Modules in LAZY are only needed by commands, forms or optional features;
+if startup loads one of them it is listed and the exit status is 1.
+--importtime also prints the slowest imports (by their own time, from
+`python -X importtime`).
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+# imported by what needs them, never at startup
+LAZY = ('flask_migrate', 'alembic', 'forms', 'flask_wtf', 'wtforms', 'phonenumbers', 'babel.dates', 'importer',
+        'explain', 'PIL', 'redis', 'asyncpg', 'starlette')
+
+
+def child():
+  # runs inside the fresh process; prints one JSON line
+  timings = {}
+  started = time.perf_counter()
+  import app
+  timings['import'] = (time.perf_counter() - started) * 1000
+
+  from config import get_config
+  class settings(get_config('production')):
+    SECRET_KEY = 'bench'
+    LOG_FILE = ''
+  started = time.perf_counter()
+  flask_app = app.create_app(settings)
+  timings['create_app'] = (time.perf_counter() - started) * 1000
+
+  started = time.perf_counter()
+  flask_app.test_client().get('/')
+  timings['first_request'] = (time.perf_counter() - started) * 1000
+
+  # ru_maxrss is in KiB on Linux
+  timings['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+  timings['modules'] = len(sys.modules)
+  timings['eager'] = [name for name in LAZY if name in sys.modules]
+  print(json.dumps(timings))
+
+
+def run():
+  output = subprocess.run(
+    [sys.executable, '-W', 'ignore', '-m', 'benchmarks.startup', '--child'],
+    check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+  return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(count):
+  # [(self us, cumulative us, module)] of `from app import create_app`
+  stderr = subprocess.run(
+    [sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', 'from app import create_app'],
+    check=True, stderr=subprocess.PIPE, universal_newlines=True).stderr
+  rows = []
+  for line in stderr.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+    own, cumulative, name = line[len('import time:'):].split('|')
+    rows.append((int(own), int(cumulative), name.strip()))
+  return sorted(rows, reverse=True)[:count]
+
+
+def median(values):
+  ordered = sorted(values)
+  return ordered[len(ordered) // 2]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--runs', type=int, default=5, help='fresh processes')
+  parser.add_argument('--importtime', type=int, metavar='N', help='also list the N slowest imports')
+  parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.child:
+    return child()
+
+  runs = [run() for _ in range(args.runs)]
+  print('%9s %11s %14s %8s %8s   (median of %d runs)' % (
+    'import ms', 'create ms', 'first GET ms', 'RSS MB', 'modules', args.runs))
+  print('%9.1f %11.1f %14.1f %8.1f %8d' % tuple(
+    median([timings[key] for timings in runs]) for key in ('import', 'create_app', 'first_request', 'peak_rss_mb', 'modules')))
+
+  if args.importtime:
+    print('\n%9s %9s  %s' % ('self ms', 'cum. ms', 'module'))
+    for own, cumulative, name in slowest_imports(args.importtime):
+      print('%9.1f %9.1f  %s' % (own / 1000.0, cumulative / 1000.0, name))
+
+  eager = sorted(set(name for timings in runs for name in timings['eager']))
+  if eager:
+    print('\nloaded at startup, should be lazy: %s' % ', '.join(eager), file=sys.stderr)
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,258 @@
+#----------------------------------------------------------------------------#
+# Page cache.
+#
+# Rendered GET responses are stored per URL together with tags naming the
+# entities they show ('venue:3', 'artists', ...). Write handlers invalidate
+# the tags they touched after a successful commit, which drops exactly the
+# pages that could have changed. Entries also expire after a TTL, which
+# bounds staleness from things no handler sees: shows moving from upcoming to
+# past as time passes, and writes made by other worker processes when the
+# in-process backend is used.
+#
+# Each app has its own cache in app.extensions['page_cache'], set up by
+# init_app(); `page_cache` is the current app's.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request, session
+from werkzeug.local import LocalProxy
+
+from conditional import etag_of, page_salt
+from routing import primary, reads_own_writes
+
+
+class CacheBackend(object):
+  # Storage interface. Values are bytes; tags are strings.
+
+  def get(self, key):
+    raise NotImplementedError
+
+  def set(self, key, value, ttl, tags=()):
+    raise NotImplementedError
+
+  def invalidate_tags(self, tags):
+    raise NotImplementedError
+
+  def clear(self):
+    raise NotImplementedError
+
+  def __len__(self):
+    raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+  # In-process backend: least recently used entries are evicted beyond
+  # `max_entries`, expired entries are dropped when read.
+
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._tags = {}
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      expires_at, value, tags = entry
+      if expires_at < time.monotonic():
+        self._delete(key)
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl, tags=()):
+    with self._lock:
+      self._delete(key)
+      self._entries[key] = (time.monotonic() + ttl, value, frozenset(tags))
+      for tag in tags:
+        self._tags.setdefault(tag, set()).add(key)
+      while len(self._entries) > self.max_entries:
+        self._delete(next(iter(self._entries)))
+
+  def invalidate_tags(self, tags):
+    with self._lock:
+      for tag in tags:
+        for key in list(self._tags.get(tag, ())):
+          self._delete(key)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._tags.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def _delete(self, key):
+    entry = self._entries.pop(key, None)
+    if entry is None:
+      return
+    for tag in entry[2]:
+      keys = self._tags.get(tag)
+      if keys is not None:
+        keys.discard(key)
+        if not keys:
+          del self._tags[tag]
+
+
+class RedisCache(CacheBackend):
+  # Shared backend for any client speaking the redis-py API (a local Redis,
+  # or a stand-in such as fakeredis in development). Tags are Redis sets of
+  # the keys carrying them.
+
+  def __init__(self, client, prefix='fyyur:page:'):
+    self.client = client
+    self.prefix = prefix
+
+  def get(self, key):
+    return self.client.get(self.prefix + key)
+
+  def set(self, key, value, ttl, tags=()):
+    pipe = self.client.pipeline()
+    pipe.set(self.prefix + key, value, ex=int(ttl))
+    for tag in tags:
+      pipe.sadd(self.prefix + 'tag:' + tag, key)
+      pipe.expire(self.prefix + 'tag:' + tag, int(ttl))
+    pipe.execute()
+
+  def invalidate_tags(self, tags):
+    for tag in tags:
+      tag_key = self.prefix + 'tag:' + tag
+      keys = self.client.smembers(tag_key)
+      if keys:
+        self.client.delete(*[self.prefix + key.decode() for key in keys])
+      self.client.delete(tag_key)
+
+  def clear(self):
+    keys = list(self.client.scan_iter(self.prefix + '*'))
+    if keys:
+      self.client.delete(*keys)
+
+  def __len__(self):
+    return sum(1 for key in self.client.scan_iter(self.prefix + '*') if b':tag:' not in key)
+
+
+class PageCache(object):
+
+  def __init__(self, backend=None, ttl=60, enabled=True):
+    self.backend = backend
+    self.ttl = ttl
+    self.enabled = enabled
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  def applies(self):
+    # pages carrying flashed messages are personal, never cache them; nor
+    # those of a client reading its own writes from the primary
+    return self.enabled and request.method == 'GET' and not session.get('_flashes') and not reads_own_writes()
+
+  def key(self):
+    # the request's URL, under the markup it was rendered with
+    salt = hashlib.sha1(repr(page_salt()).encode()).hexdigest()[:12]
+    return '%s:%s' % (salt, request.full_path)
+
+  def stored(self):
+    # (ETag, response) stored for this request, or None; the ETag is '' for
+    # pages without conditional GET
+    value = self.backend.get(self.key())
+    if value is None:
+      return None
+    mimetype, etag, body = value.split(b'\n', 2)
+    return etag.decode(), Response(body, mimetype=mimetype.decode())
+
+  def lookup(self, etag=''):
+    # the stored response for this request, or None
+    return self.counted(self.stored(), etag)
+
+  def counted(self, stored, etag=''):
+    # the response of a stored() entry if it was stored under `etag`, the
+    # ETag conditional GET gives the page now; anything else was rendered
+    # from other data and is a miss
+    if stored is None or stored[0] != etag:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return stored[1]
+
+  def fill(self, view, tags):
+    # the response of view(), stored under `tags` and those the view adds,
+    # with the ETag conditional GET gave it
+    g.page_cache_tags = set(tags)
+    response = make_response(view())
+    if response.status_code == 200 and not response.is_streamed and self.storable():
+      value = b'\n'.join([response.mimetype.encode(), g.get('page_etag', '').encode(), response.get_data()])
+      self.backend.set(self.key(), value, self.ttl, g.page_cache_tags)
+    return response
+
+  def storable(self):
+    # A page read from the replica may predate writes whose invalidations
+    # already ran on the primary; it is only stored when the primary's
+    # stamp gives the same ETag. Pages without a stamp never are.
+    if not g.get('use_replica'):
+      return True
+    if 'page_stamp' not in g:
+      return False
+    with primary():
+      result = g.page_stamp()
+    etag = etag_of(result[0], page_salt(), request.full_path) if result is not None else ''
+    return etag == g.get('page_etag', '')
+
+  def add_tags(self, *tags):
+    # tags the page being rendered with more entities (no-op when not caching)
+    if 'page_cache_tags' in g:
+      g.page_cache_tags.update(tags)
+
+  def invalidate(self, *tags):
+    self.invalidations += 1
+    self.backend.invalidate_tags(tags)
+
+  def stats(self):
+    lookups = self.hits + self.misses
+    return {
+      'enabled': self.enabled,
+      'backend': type(self.backend).__name__,
+      'entries': len(self.backend),
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_ratio': float(self.hits) / lookups if lookups else None,
+      'invalidations': self.invalidations,
+    }
+
+
+def init_app(app):
+  # backend, TTL and switch from the PAGE_CACHE_* settings
+  if app.config['PAGE_CACHE_REDIS_URL']:
+    import redis
+    backend = RedisCache(redis.Redis.from_url(app.config['PAGE_CACHE_REDIS_URL']))
+  else:
+    backend = LRUCache(max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'])
+  app.extensions['page_cache'] = PageCache(backend, app.config['PAGE_CACHE_TTL'], app.config['PAGE_CACHE_ENABLED'])
+
+
+page_cache = LocalProxy(lambda: current_app.extensions['page_cache'])
+
+
+def cached(*tags):
+  # Caches the decorated GET view in the current app's page cache. `tags`
+  # may use the view arguments, e.g. 'venue:{venue_id}'; the view can add
+  # more with page_cache.add_tags().
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      cache = current_app.extensions['page_cache']
+      if not cache.applies():
+        return view(*args, **kwargs)
+      response = cache.lookup(g.get('page_etag', ''))
+      if response is not None:
+        return response
+      return cache.fill(lambda: view(*args, **kwargs), [tag.format(**kwargs) for tag in tags])
+    return wrapper
+  return decorator
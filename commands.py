@@ -0,0 +1,140 @@
+#----------------------------------------------------------------------------#
+# Commands.
+#
+# `flask <command>`, added to the app by create_app(). What only a command
+# needs (the importer and its forms, the exporter, EXPLAIN) is imported when
+# the command runs, not when a worker starts.
+#----------------------------------------------------------------------------#
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import assets
+from cache import page_cache
+from models import db, refresh_show_counts
+
+
+@click.command('refresh-show-counts')
+@with_appcontext
+def refresh_show_counts_command():
+  """Roll passed shows from upcoming to past; run periodically (e.g. cron)."""
+  refresh_show_counts()
+  db.session.commit()
+  click.echo('Show counters refreshed.')
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows validated and written per transaction.')
+@click.option('--dry-run', is_flag=True, help='Validate only.')
+@click.option('--max-errors', default=20, show_default=True, help='Rejected rows to print.')
+@with_appcontext
+def import_command(kind, path, format, chunk_size, dry_run, max_errors):
+  """Bulk load venues, artists or shows from a CSV or JSONL file."""
+  from importer import ImportFailed, format_of, import_rows, read_rows
+  with open(path, newline='', encoding='utf-8') as stream:
+    try:
+      result = import_rows(kind, read_rows(stream, format or format_of(path)), chunk_size=chunk_size, dry_run=dry_run)
+    except ImportFailed as e:
+      raise click.ClickException(str(e))
+
+  for number, errors in result.errors[:max_errors]:
+    click.echo('line %d: %s' % (number, '; '.join(
+      '%s: %s' % (field, ' '.join(messages)) for field, messages in sorted(errors.items()))), err=True)
+  if len(result.errors) > max_errors:
+    click.echo('... %d more rejected rows' % (len(result.errors) - max_errors), err=True)
+
+  if result.imported and not dry_run:
+    tags = [kind]
+    if kind == 'shows':
+      tags += ['venues', 'artists'] + ['venue:%d' % id for id in result.venue_ids] + ['artist:%d' % id for id in result.artist_ids]
+    page_cache.invalidate(*tags)
+
+  rate = (result.imported + result.rejected) / result.seconds if result.seconds else 0
+  click.echo('%s %d %s, rejected %d, in %.1fs (%.0f rows/s)' % (
+    'Validated' if dry_run else 'Imported', result.imported, kind, result.rejected, result.seconds, rate))
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', type=click.Choice(['csv', 'jsonl']), default='jsonl', show_default=True)
+@click.option('--since', help='Only rows changed at or after this timestamp.')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Defaults to stdout.')
+@with_appcontext
+def export_command(kind, format, since, output):
+  """Stream venues, artists or shows out as CSV or JSONL."""
+  from exporter import export
+  from showrows import parse_datetime
+  if since:
+    try:
+      since = parse_datetime(since)
+    except (ValueError, OverflowError):
+      raise click.BadParameter('not a timestamp', param_hint='--since')
+  for chunk in export(kind, format, since or None):
+    output.write(chunk)
+
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates_command():
+  """Compile every template into the bytecode cache; run at deploy time."""
+  from warmup import compile_templates
+  if not current_app.config['TEMPLATE_CACHE_DIR']:
+    raise click.ClickException('TEMPLATE_CACHE_DIR is not set.')
+  names = compile_templates(current_app)
+  click.echo('Compiled %d templates into %s' % (len(names), current_app.config['TEMPLATE_CACHE_DIR']))
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+  """Bundle, minify and fingerprint the static assets into static/dist."""
+  manifest = assets.build(current_app)
+  for name, built in manifest.items():
+    click.echo('%s -> %s' % (name, built))
+  if assets.brotli is None:
+    click.echo('brotli is not installed, only gzip variants were written.', err=True)
+
+@click.command('check-indexes')
+@with_appcontext
+def check_indexes_command():
+  """EXPLAIN the queries the pages run and fail if their index is not used."""
+  from sqlalchemy import inspect
+  from explain import plan_index_names
+  from queries import (artist_detail_query, artist_search_query, shows_page_query, venue_detail_query,
+                       venue_search_query)
+  limit = current_app.config['SEARCH_RESULT_LIMIT']
+  checks = [
+    ('show_venue', 'ix_Show_venue_id_start_time', venue_detail_query(1)),
+    ('show_artist', 'ix_Show_artist_id_start_time', artist_detail_query(1)),
+    ('shows_upcoming', 'ix_Show_start_time_id', shows_page_query('upcoming', current_app.config['SHOWS_PER_PAGE'])),
+    ('shows_past', 'ix_Show_start_time_id', shows_page_query('past', current_app.config['SHOWS_PER_PAGE'])),
+    # several words are only matched as word prefixes, one also anywhere in the name
+    ('search_venues', 'ix_Venue_search_vector', venue_search_query('musical hop', limit)),
+    ('search_artists', 'ix_Artist_search_vector', artist_search_query('wild band', limit)),
+    ('name_substring', 'ix_Venue_name_trgm', venue_search_query('music', limit)),
+  ]
+
+  failed = False
+  with db.engine.connect() as connection:
+    existing = set(index['name'] for table in ('Venue', 'Artist', 'Show')
+                   for index in inspect(connection).get_indexes(table))
+    for name, index, query in checks:
+      if index.endswith('_trgm') and index not in existing:
+        # created only where pg_trgm is available (see migration 8f3c2a6e91b7)
+        click.echo('skip %s: %s does not exist' % (name, index))
+        continue
+      used = plan_index_names(connection, query)
+      ok = index in used
+      failed = failed or not ok
+      click.echo('%s %s: expected %s, plan uses %s' % ('ok  ' if ok else 'FAIL', name, index, sorted(used) or 'no index'))
+  if failed:
+    raise SystemExit(1)
+
+
+COMMANDS = (refresh_show_counts_command, import_command, export_command, compile_templates_command,
+            build_assets_command, check_indexes_command)
+
+
+def init_app(app):
+  for command in COMMANDS:
+    app.cli.add_command(command)
@@ -0,0 +1,85 @@
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#
+# A view decorated with @conditional(stamp) first asks `stamp` for a cheap
+# version of what the page shows (one aggregate query over updated_at
+# columns). If the client already holds that version the view is skipped
+# entirely and a 304 is returned before the page query and the template run.
+# Pages cached by cache.py are stored with their ETag, so a cached body is
+# never sent under the ETag of newer data.
+#----------------------------------------------------------------------------#
+
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+
+def conditional(stamp):
+  # stamp(**view_args) returns (version, last_modified), or None to skip.
+  # `version` is any repr()-able value that changes whenever the page would;
+  # `last_modified` is the newest change time it covers.
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      if not revalidates():
+        return view(*args, **kwargs)
+      # asked again on the primary before the page cache stores a page read
+      # from the replica (see cache.py)
+      g.page_stamp = lambda: stamp(**kwargs)
+      return revalidate(stamp(**kwargs), lambda: view(*args, **kwargs))
+    return wrapper
+  return decorator
+
+
+def revalidates():
+  # pages carrying flashed messages are personal, always render them
+  return request.method in ('GET', 'HEAD') and not session.get('_flashes')
+
+
+def revalidate(result, view):
+  # A 304 if the client holds the version in `result` (what a stamp returned),
+  # otherwise the response of view(); either carries the validators.
+  if result is None:
+    return view()
+  version, last_modified = result
+  if last_modified is not None and last_modified.tzinfo is not None:
+    # werkzeug compares HTTP dates as naive UTC
+    last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None)
+  etag = etag_of(version, page_salt(), request.full_path)
+
+  if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+    response = current_app.response_class(status=304)
+  else:
+    # the page cache only serves a page stored under this same ETag
+    g.page_etag = etag
+    response = make_response(view())
+    if response.status_code != 200:
+      return response
+
+  response.set_etag(etag)
+  if last_modified is not None:
+    response.last_modified = last_modified
+  # shared caches may store the page but must revalidate it every time
+  response.cache_control.public = True
+  response.cache_control.no_cache = True
+  return response
+
+
+def etag_of(version, salt, full_path):
+  return hashlib.sha1(repr((salt, full_path, version)).encode()).hexdigest()
+
+
+def page_salt():
+  # what a rendered page depends on besides its data: ETAG_SALT, and the key
+  # its thumbnail links are signed with (see thumbnails.py)
+  thumbnails = current_app.extensions.get('thumbnails')
+  return current_app.config['ETAG_SALT'], thumbnails.fingerprint if thumbnails is not None else None
+
+
+def newest(*stamps):
+  # latest of the given datetimes, ignoring missing ones
+  stamps = [stamp for stamp in stamps if stamp is not None]
+  return max(stamps) if stamps else None
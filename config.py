@@ -1,10 +1,161 @@
 import os
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+def _env_int(name, default):
+  value = os.environ.get(name)
+  return int(value) if value else default
 
-# DONE: IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://postgres@localhost:5432/fyyur'
+def _env_flag(name, default=False):
+  value = os.environ.get(name)
+  return value.lower() in ('1', 'true', 'yes', 'on') if value else default
+
+
+class Config(object):
+  # Settings shared by every environment. Deployment specifics come from
+  # environment variables; pick the class with FYYUR_ENV (see get_config).
+  # signs sessions and CSRF tokens; required in production (create_app fails
+  # without it), where every worker and restart must share it
+  SECRET_KEY = os.environ.get('SECRET_KEY')
+
+  # Enable debug mode.
+  DEBUG = False
+
+  # DONE: IMPLEMENT DATABASE URL
+  SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://postgres@localhost:5432/fyyur')
+  SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+  # connection pool per worker process (see pooling.py); up to
+  # DB_POOL_SIZE + DB_MAX_OVERFLOW connections, waiting DB_POOL_TIMEOUT
+  # seconds for a free one before failing
+  DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+  DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+  DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 10)
+  # seconds after which a pooled connection is replaced
+  DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+  # test connections on checkout so a restarted server costs no failed request
+  DB_POOL_PRE_PING = _env_flag('DB_POOL_PRE_PING', True)
+  # milliseconds before Postgres cancels a statement (0 disables)
+  DB_STATEMENT_TIMEOUT = _env_int('DB_STATEMENT_TIMEOUT', 30000)
+  # when connecting through PgBouncer in transaction mode: no client-side
+  # pool, and the statement timeout is set per transaction
+  DB_PGBOUNCER = _env_flag('DB_PGBOUNCER')
+
+  # connections per process of the async read routes served by `uvicorn
+  # asgi:app` (see asyncdb.py); the routes it hands to the WSGI app keep
+  # using the DB_POOL_* pool
+  ASYNC_DB_POOL_SIZE = _env_int('ASYNC_DB_POOL_SIZE', 10)
+
+  # read replica for the listing, detail and search views (see routing.py);
+  # unset reads everything from the primary
+  DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+  # seconds a client reads from the primary after its last write, longer
+  # than the replica usually lags
+  REPLICA_STICKY_SECONDS = _env_int('REPLICA_STICKY_SECONDS', 10)
+
+  # per-request SQL timing (see querystats.py): a Server-Timing header with the
+  # database time and statement count, and a JSON log line for requests slower
+  # than SLOW_REQUEST_MS or running a statement slower than SLOW_QUERY_MS,
+  # listing its SLOW_QUERIES_LOGGED slowest statements
+  SERVER_TIMING = _env_flag('SERVER_TIMING', True)
+  SLOW_REQUEST_MS = _env_int('SLOW_REQUEST_MS', 500)
+  SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', 100)
+  SLOW_QUERIES_LOGGED = 3
+  # application log, one JSON object per line; empty logs to stderr
+  LOG_FILE = os.environ.get('LOG_FILE', 'error.log')
+
+  # seconds a show books its venue and artist for; shows of the same venue or
+  # artist starting closer together than this are rejected as conflicts
+  SHOW_DURATION = 3 * 60 * 60
+  # maximum number of shows accepted by one POST /api/v1/shows/batch
+  SHOW_BATCH_MAX = 500
+
+  # locale and time zone dates are shown in (see the datetime filters in app.py)
+  DATETIME_LOCALE = 'en_US'
+  DATETIME_TIMEZONE = 'UTC'
+
+  # compiled templates are kept here and reused by every worker; fill it at
+  # deploy time with `flask compile-templates` (None compiles in memory only)
+  TEMPLATE_CACHE_DIR = os.path.join(basedir, '.template_cache')
+  # pages warm_up() renders once before a worker takes traffic (see warmup.py)
+  WARM_UP = True
+  WARM_UP_URLS = ['/', '/venues', '/artists', '/shows']
+
+  # venue and artist images are shown as thumbnails made by /thumbnails (see
+  # thumbnails.py), kept in THUMBNAIL_CACHE_DIR up to THUMBNAIL_CACHE_MAX_BYTES
+  THUMBNAILS_ENABLED = _env_flag('THUMBNAILS_ENABLED', True)
+  THUMBNAIL_CACHE_DIR = os.environ.get('THUMBNAIL_CACHE_DIR', os.path.join(basedir, '.thumbnail_cache'))
+  THUMBNAIL_CACHE_MAX_BYTES = _env_int('THUMBNAIL_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+  # key thumbnail URLs are signed with; the same in every worker and across
+  # restarts, since rendered and cached pages carry the signatures. Without
+  # it thumbnails stay off and pages link the original images.
+  THUMBNAIL_SECRET = os.environ.get('THUMBNAIL_SECRET')
+  # seconds to wait for a source image
+  THUMBNAIL_FETCH_TIMEOUT = 5
+  # read source images from this directory (by file name) instead of fetching
+  # them, for working offline
+  THUMBNAIL_SOURCE_DIR = os.environ.get('THUMBNAIL_SOURCE_DIR')
+
+  # /shows keyset pagination
+  SHOWS_PER_PAGE = 30
+  SHOWS_MAX_PER_PAGE = 100
+  # stream /shows through the template while rows are fetched (?stream=1 per request)
+  SHOWS_STREAM = 0
+  # number of template chunks collected before each write when streaming
+  TEMPLATE_STREAM_BUFFER = 5
+
+  # maximum number of rows returned by the venue/artist searches
+  SEARCH_RESULT_LIMIT = 50
+
+  # seconds before a worker rebuilds its in-memory search suggestions from the database
+  SUGGEST_MAX_AGE = 300
+
+  # rendered page cache (see cache.py); entries are dropped on writes and after the TTL
+  PAGE_CACHE_ENABLED = True
+  PAGE_CACHE_TTL = 60
+  PAGE_CACHE_MAX_ENTRIES = 1024
+  # share the cache between workers through Redis instead of keeping it in-process
+  PAGE_CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+
+  # mixed into every ETag; change it on deploys that alter page markup
+  ETAG_SALT = os.environ.get('ETAG_SALT', '')
+
+  # /api/v1 list pagination
+  API_PAGE_SIZE = 50
+  API_MAX_PAGE_SIZE = 200
+
+
+class DevelopmentConfig(Config):
+  DEBUG = True
+  WARM_UP = False
+  SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
+  THUMBNAIL_SECRET = os.environ.get('THUMBNAIL_SECRET', 'development')
+  DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 2)
+  DB_STATEMENT_TIMEOUT = _env_int('DB_STATEMENT_TIMEOUT', 0)
+
+
+class TestingConfig(Config):
+  TESTING = True
+  WTF_CSRF_ENABLED = False
+  SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
+  SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://postgres@localhost:5432/fyyur_test')
+  PAGE_CACHE_ENABLED = False
+  TEMPLATE_CACHE_DIR = None
+  WARM_UP = False
+  DB_STATEMENT_TIMEOUT = _env_int('DB_STATEMENT_TIMEOUT', 5000)
+
+
+class ProductionConfig(Config):
+  DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+  DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 20)
+
+
+configs = {
+  'development': DevelopmentConfig,
+  'testing': TestingConfig,
+  'production': ProductionConfig,
+}
+
+def get_config(name=None):
+  # FYYUR_ENV picks the class; development when unset
+  return configs[name or os.environ.get('FYYUR_ENV', 'development')]
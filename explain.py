@@ -0,0 +1,31 @@
+#----------------------------------------------------------------------------#
+# EXPLAIN helpers.
+#
+# Used by `flask check-indexes` to prove the planner can answer the hot
+# queries from the indexes created in the migrations.
+#----------------------------------------------------------------------------#
+
+
+def plan_index_names(connection, query, disable_seqscan=True):
+  # Returns the set of index names referenced by the plan of `query`.
+  # Small development tables are always cheaper to scan sequentially, so by
+  # default sequential scans are disabled for the duration of the EXPLAIN;
+  # that asks "can an index serve this query" rather than "is it cheaper".
+  compiled = query.statement.compile(dialect=connection.dialect)
+  transaction = connection.begin()
+  try:
+    if disable_seqscan:
+      connection.execute('SET LOCAL enable_seqscan = off')
+    result = connection.execute('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+    plan = result.scalar()[0]['Plan']
+  finally:
+    transaction.rollback()
+  return set(_walk_index_names(plan))
+
+
+def _walk_index_names(node):
+  if 'Index Name' in node:
+    yield node['Index Name']
+  for child in node.get('Plans', ()):
+    for name in _walk_index_names(child):
+      yield name
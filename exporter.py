@@ -0,0 +1,113 @@
+#----------------------------------------------------------------------------#
+# Bulk export.
+#
+# Writes venues, artists or shows as CSV or JSONL from a server-side cursor,
+# a batch of rows at a time, so memory stays flat however large the table
+# is. The output uses the field names `flask import` reads back.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import date
+
+from sqlalchemy import func
+
+from models import db, Venue, Artist, Show
+from queries import ARTIST_FIELDS, SHOW_FIELDS, VENUE_FIELDS, columns
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+FORMATS = ('csv', 'jsonl')
+
+# kind -> (model exported, exported fields)
+EXPORTS = {
+  'venues': (Venue, VENUE_FIELDS),
+  'artists': (Artist, ARTIST_FIELDS),
+  'shows': (Show, SHOW_FIELDS),
+}
+
+# rows fetched from the cursor and encoded per chunk of output
+BATCH_SIZE = 1000
+
+
+def _default(value):
+  if isinstance(value, date):
+    return value.isoformat()
+  raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def dumps(payload):
+  # orjson when installed, else the stdlib encoder without whitespace
+  if orjson is not None:
+    return orjson.dumps(payload)
+  return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def export_query(kind, since=None):
+  model, fields = EXPORTS[kind]
+  if kind == 'shows':
+    # a show row carries its venue's and artist's names and images, so it
+    # has changed when any of the three has
+    updated_at = func.greatest(Show.updated_at, Venue.updated_at, Artist.updated_at)
+  else:
+    updated_at = model.updated_at
+  query = db.session.query(*columns(fields), updated_at.label('updated_at'))
+  if kind == 'shows':
+    query = query.filter(Show.venue_id == Venue.id).filter(Show.artist_id == Artist.id)
+  if since is not None:
+    query = query.filter(updated_at >= since)
+  # stream_results asks psycopg2 for a named (server-side) cursor
+  return query.order_by(model.id)\
+    .execution_options(stream_results=True)\
+    .yield_per(BATCH_SIZE)
+
+
+def _batches(rows):
+  batch = []
+  for row in rows:
+    batch.append(row)
+    if len(batch) == BATCH_SIZE:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+
+def _csv_value(value):
+  # genres are ';' separated, as `flask import` expects
+  if isinstance(value, list):
+    return ';'.join(value)
+  if isinstance(value, date):
+    return value.isoformat()
+  return value
+
+
+def export_csv(rows, fields):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(fields)
+  for batch in _batches(rows):
+    for row in batch:
+      writer.writerow([_csv_value(value) for value in row])
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+  if buffer.tell():
+    yield buffer.getvalue().encode()
+
+
+def export_jsonl(rows, fields):
+  for batch in _batches(rows):
+    yield b''.join(dumps(dict(zip(fields, row))) + b'\n' for row in batch)
+
+
+def export(kind, format, since=None):
+  # yields the encoded output in chunks of BATCH_SIZE rows
+  query = export_query(kind, since)
+  fields = [column['name'] for column in query.column_descriptions]
+  write = export_csv if format == 'csv' else export_jsonl
+  return write(query, fields)
@@ -1,43 +1,44 @@
 from datetime import datetime
-from flask_wtf import Form
+from functools import lru_cache
+from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, TextAreaField, ValidationError, IntegerField
 from wtforms.validators import DataRequired, AnyOf, URL, Length, NumberRange, Regexp
-import phonenumbers
 
 facebook_regex = "((http|https):\/\/|)(www\.|)facebook\.com\/[a-zA-Z0-9.]{1,}";
 facebook_invalid_message = "Facebook URL is Invalid"
 
 def ValidatorChoices(choices, message = 'Invalid choice selected'):
-    # only str or list values accepted
+    # only str or list values accepted; the allowed values are built once
+    choices_values = frozenset(choice[1] for choice in choices)
     def _validator(form, field):
-        choices_values = [choice[1] for choice in choices]
-        if isinstance(field.data, str):
-            if field.data not in choices_values:
-                raise ValidationError(message)
-        else:
-            for value in field.data:
-                if value not in choices_values:
-                    raise ValidationError(message)
+        values = (field.data,) if isinstance(field.data, str) else field.data
+        if not choices_values.issuperset(values):
+            raise ValidationError(message)
 
     return _validator
 
-def ValidatorPhone():
+@lru_cache(maxsize=4096)
+def normalize_phone(number):
     # Ref: https://stackoverflow.com/questions/36251149/validating-us-phone-number-in-wtfforms
+    # E.164 form of a valid number, read as a US number when it has no
+    # country code; None when invalid. Results are memoized since the same
+    # numbers come back on every edit and import.
+    if len(number) > 16:
+        return None
+    # imported here: its metadata is only needed once a number is checked
+    import phonenumbers
+    try:
+        parsed = phonenumbers.parse(number, 'US')
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+def ValidatorPhone():
     def _validate_phone(form, field):
-        if len(field.data) > 16:
+        if normalize_phone(field.data or '') is None:
             raise ValidationError('Invalid phone number.')
-        try:
-            input_number = phonenumbers.parse(field.data)
-            if not (phonenumbers.is_valid_number(input_number)):
-                raise ValidationError('Invalid phone number.')
-        except:
-            try:
-                input_number = phonenumbers.parse("+1"+field.data)
-                if not (phonenumbers.is_valid_number(input_number)):
-                    raise ValidationError('Invalid phone number.')
-            except:
-                raise ValidationError('Invalid phone number.')
-        return None
 
     return _validate_phone;
 
@@ -117,7 +118,7 @@ state_choices=[
     ('WY', 'WY'),
 ]
 
-class ShowForm(Form):
+class ShowForm(FlaskForm):
     artist_id = StringField(
         'artist_id'
     )
@@ -130,7 +131,7 @@ class ShowForm(Form):
         default= datetime.today()
     )
 
-class VenueForm(Form):
+class VenueForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -171,7 +172,7 @@ class VenueForm(Form):
         'image_link', validators=[URL(), Length(max=500)]
     )
 
-class ArtistForm(Form):
+class ArtistForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -211,7 +212,7 @@ class ArtistForm(Form):
     )
 
 # DONE IMPLEMENT NEW ARTIST FORM AND NEW SHOW FORM
-class ShowForm(Form):
+class ShowForm(FlaskForm):
     artist_id = IntegerField(
         'artist_id', validators=[DataRequired(), NumberRange(min=1, message="ID cannot be negative or string")]
     )
@@ -0,0 +1,230 @@
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Streams venues, artists or shows from CSV/JSONL files in chunks. Rows are
+# validated with the same rules as the web forms and each chunk is written
+# with a single COPY (one executemany INSERT on other drivers) instead of one
+# ORM object and INSERT per row.
+#
+# Shows name their venue and artist either by id (venue_id, artist_id) or by
+# exact name (venue_name, artist_name); both are resolved with one query per
+# chunk (see showrows.py).
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import time
+from collections import namedtuple
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField
+from wtforms.validators import DataRequired
+
+from models import db, Venue, Artist, Show, refresh_show_counts
+from showrows import present, resolve, show_values
+
+# columns written per kind; the remaining ones keep their server defaults
+VENUE_COLUMNS = ('name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link',
+                 'genres', 'website', 'seeking_talent', 'seeking_description')
+ARTIST_COLUMNS = ('name', 'city', 'state', 'phone', 'genres', 'image_link', 'facebook_link',
+                  'website', 'seeking_venue', 'seeking_description')
+SHOW_COLUMNS = ('venue_id', 'artist_id', 'start_time')
+
+# spellings of false in CSV cells (WTForms only knows 'false' and '')
+FALSE_VALUES = frozenset(('', '0', 'f', 'false', 'n', 'no', 'off'))
+
+ImportResult = namedtuple('ImportResult', ['imported', 'rejected', 'errors', 'seconds', 'venue_ids', 'artist_ids'])
+
+
+class ImportFailed(Exception):
+  pass
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+def read_rows(stream, format):
+  # yields (line number, dict) from an open text stream
+  if format == 'jsonl':
+    for number, line in enumerate(stream, 1):
+      if line.strip():
+        try:
+          yield number, json.loads(line)
+        except ValueError as e:
+          raise ImportFailed('line %d: %s' % (number, e))
+  elif format == 'csv':
+    reader = csv.DictReader(stream)
+    for row in reader:
+      # genres are ';' separated inside a CSV cell
+      if row.get('genres'):
+        row['genres'] = [genre.strip() for genre in row['genres'].split(';') if genre.strip()]
+      yield reader.line_num, row
+  else:
+    raise ImportFailed('unknown format %r' % format)
+
+
+def format_of(path):
+  return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def chunks(iterable, size):
+  iterator = iter(iterable)
+  while True:
+    chunk = list(islice(iterator, size))
+    if not chunk:
+      return
+    yield chunk
+
+
+#  Validation
+#  ----------------------------------------------------------------
+
+def _formdata(row):
+  data = MultiDict()
+  for name, value in row.items():
+    if isinstance(value, list):
+      for item in value:
+        data.add(name, item)
+    elif isinstance(value, bool):
+      if value:
+        data.add(name, 'y')
+    elif isinstance(value, str) and value.strip().lower() in FALSE_VALUES:
+      continue
+    else:
+      data.add(name, str(value))
+  return data
+
+
+def validate(form, columns, row):
+  # returns (values, errors) checked by the web form's validators; rules of
+  # fields missing from the input only apply when the field is required.
+  # One form instance is reprocessed for every row of an import.
+  row = present(row)
+  form.process(_formdata(row))
+  form.validate()
+  errors = {
+    name: messages for name, messages in form.errors.items()
+    if name in row or any(isinstance(validator, DataRequired) for validator in form[name].validators)
+  }
+  values = {}
+  for name in columns:
+    field = form[name]
+    if isinstance(field, BooleanField):
+      values[name] = field.data
+    else:
+      values[name] = field.data if name in row else None
+  return values, errors
+
+
+#  Writing
+#  ----------------------------------------------------------------
+
+# backslash escapes of COPY's text format
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value):
+  # one field in COPY's text format
+  if value is None:
+    return '\\N'
+  if isinstance(value, bool):
+    return 't' if value else 'f'
+  if isinstance(value, list):
+    value = '{%s}' % ','.join('"%s"' % item.replace('\\', '\\\\').replace('"', '\\"') for item in value)
+  elif hasattr(value, 'isoformat'):
+    value = value.isoformat()
+  else:
+    value = str(value)
+  return value.translate(_COPY_ESCAPES)
+
+
+def insert_rows(table, columns, rows):
+  # one COPY on psycopg2, one executemany INSERT elsewhere
+  if not rows:
+    return
+  connection = db.session.connection()
+  if connection.dialect.driver == 'psycopg2':
+    buffer = io.StringIO()
+    for row in rows:
+      buffer.write('\t'.join([_copy_value(row[column]) for column in columns]))
+      buffer.write('\n')
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+      cursor.copy_expert('COPY "%s" (%s) FROM STDIN' % (table.name, ', '.join(columns)), buffer)
+  else:
+    connection.execute(table.insert(), [dict((column, row[column]) for column in columns) for row in rows])
+
+
+#  Pipeline
+#  ----------------------------------------------------------------
+
+def import_rows(kind, rows, chunk_size=5000, dry_run=False):
+  # rows: iterable of (line number, dict). Every chunk is committed on its
+  # own, with the show counters of its venues and artists; rejected rows are
+  # reported as (line number, errors) and skipped.
+  imported = rejected = 0
+  errors = []
+  venue_ids, artist_ids = set(), set()
+  started = time.monotonic()
+
+  for chunk in chunks(rows, chunk_size):
+    good = []
+    # a JSONL line may hold any JSON value, not only an object
+    objects = []
+    for number, row in chunk:
+      if isinstance(row, dict):
+        objects.append((number, row))
+      else:
+        errors.append((number, {kind[:-1]: ['Must be an object.']}))
+    if kind == 'shows':
+      checked = [(number,) + show_values(row) for number, row in objects]
+      candidates = [(number, values) for number, values, row_errors in checked if not row_errors]
+      errors.extend((number, row_errors) for number, values, row_errors in checked if row_errors)
+      values = [values for number, values in candidates]
+      unresolved = resolve(Venue, values, 'venue')
+      for index, row_errors in resolve(Artist, values, 'artist').items():
+        unresolved.setdefault(index, {}).update(row_errors)
+      for index, (number, row) in enumerate(candidates):
+        if index in unresolved:
+          errors.append((number, unresolved[index]))
+        else:
+          good.append(row)
+          venue_ids.add(row['venue_id'])
+          artist_ids.add(row['artist_id'])
+      table, columns = Show.__table__, SHOW_COLUMNS
+    else:
+      from forms import ArtistForm, VenueForm
+      form_class, columns, model = {
+        'venues': (VenueForm, VENUE_COLUMNS, Venue),
+        'artists': (ArtistForm, ARTIST_COLUMNS, Artist),
+      }[kind]
+      table = model.__table__
+      form = form_class(formdata=None, meta={'csrf': False})
+      # absent fields get the model's Python-side defaults, as with the ORM
+      defaults = dict((column.name, column.default.arg) for column in table.c
+                      if column.default is not None and column.default.is_scalar)
+      for number, row in objects:
+        values, row_errors = validate(form, columns, row)
+        if row_errors:
+          errors.append((number, row_errors))
+          continue
+        for name, value in defaults.items():
+          if values.get(name, value) is None:
+            values[name] = value
+        good.append(values)
+
+    rejected += len(chunk) - len(good)
+    if not dry_run:
+      insert_rows(table, columns, good)
+      if kind == 'shows' and good:
+        # Core inserts bypass the ORM listeners that keep the counters
+        # current; refreshed in the chunk's transaction, so a later failing
+        # chunk leaves no committed shows uncounted
+        refresh_show_counts(venue_ids=set(row['venue_id'] for row in good),
+                            artist_ids=set(row['artist_id'] for row in good))
+      db.session.commit()
+    imported += len(good)
+
+  return ImportResult(imported, rejected, errors, time.monotonic() - started, venue_ids, artist_ids)
@@ -0,0 +1,128 @@
+#----------------------------------------------------------------------------#
+# Prometheus metrics.
+#
+# Request latency and counts per endpoint, SQL time per request, connection
+# pool usage, page cache lookups and template render time, served at
+# /metrics. With several worker processes, point prometheus_multiproc_dir at
+# an empty directory before the app is imported: every worker then writes its
+# samples to memory-mapped files there and /metrics adds them up, whichever
+# worker answers the scrape.
+#----------------------------------------------------------------------------#
+
+import os
+import threading
+import time
+
+from flask import Response, g, request
+from jinja2 import Template
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+import querystats
+from pooling import pool_stats
+
+REQUEST_LATENCY = Histogram(
+  'fyyur_request_duration_seconds', 'Time to build the response, by endpoint.', ['endpoint', 'method'],
+  buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+REQUESTS = Counter('fyyur_requests_total', 'Responses sent, by endpoint and status.', ['endpoint', 'method', 'status'])
+REQUEST_DB_TIME = Histogram(
+  'fyyur_request_db_seconds', 'Time spent in SQL per request, by endpoint.', ['endpoint'],
+  buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 5))
+REQUEST_QUERIES = Histogram(
+  'fyyur_request_queries', 'SQL statements per request, by endpoint.', ['endpoint'],
+  buckets=(0, 1, 2, 3, 5, 10, 25, 100))
+TEMPLATE_RENDER = Histogram(
+  'fyyur_template_render_seconds', 'Time to render a page template.', ['template'],
+  buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1))
+
+# pool and cache figures are read from this worker's objects after each
+# request; the gauges add up over live workers, the counters carry the
+# increase since the last request
+POOL_CHECKED_OUT = Gauge('fyyur_db_pool_checked_out', 'Connections in use.', ['bind'], multiprocess_mode='livesum')
+POOL_IDLE = Gauge('fyyur_db_pool_idle', 'Connections idle in the pool.', ['bind'], multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('fyyur_db_pool_overflow', 'Connections open beyond the pool size.', ['bind'],
+                      multiprocess_mode='livesum')
+POOL_CHECKOUTS = Counter('fyyur_db_pool_checkouts_total', 'Connection checkouts.', ['bind'])
+POOL_TIMEOUTS = Counter('fyyur_db_pool_timeouts_total', 'Checkouts that gave up waiting.', ['bind'])
+POOL_WAIT = Counter('fyyur_db_pool_wait_seconds_total', 'Time spent waiting for a connection.', ['bind'])
+PAGE_CACHE = Counter('fyyur_page_cache_lookups_total', 'Page cache lookups.', ['result'])
+
+_last_seen = {}
+_last_seen_lock = threading.Lock()
+
+
+def _inc_since_last(counter, key, value):
+  with _last_seen_lock:
+    delta = value - _last_seen.get(key, 0)
+    _last_seen[key] = value
+  if delta > 0:
+    counter.inc(delta)
+
+
+class TimedTemplate(Template):
+  # times whole-page renders (render_template); included and extended
+  # templates count towards the page, streamed pages are not timed
+
+  def render(self, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+      return super(TimedTemplate, self).render(*args, **kwargs)
+    finally:
+      TEMPLATE_RENDER.labels(self.name or '<string>').observe(time.perf_counter() - started)
+
+
+def _collect_pools(engines):
+  for bind, engine in engines.items():
+    stats = pool_stats(engine)
+    if 'checkouts' not in stats:
+      continue
+    POOL_CHECKED_OUT.labels(bind).set(stats['checked_out'])
+    POOL_IDLE.labels(bind).set(stats['idle'])
+    POOL_OVERFLOW.labels(bind).set(max(stats['overflow'], 0))
+    pool = engine.pool
+    _inc_since_last(POOL_CHECKOUTS.labels(bind), (bind, 'checkouts'), pool.checkouts)
+    _inc_since_last(POOL_TIMEOUTS.labels(bind), (bind, 'timeouts'), pool.timeouts)
+    _inc_since_last(POOL_WAIT.labels(bind), (bind, 'wait'), pool.wait_seconds)
+
+
+def _collect_page_cache(page_cache):
+  _inc_since_last(PAGE_CACHE.labels('hit'), 'page_cache_hits', page_cache.hits)
+  _inc_since_last(PAGE_CACHE.labels('miss'), 'page_cache_misses', page_cache.misses)
+
+
+def registry():
+  # the registry /metrics reports: this process, or every worker's files
+  if 'prometheus_multiproc_dir' in os.environ:
+    combined = CollectorRegistry()
+    multiprocess.MultiProcessCollector(combined)
+    return combined
+  return REGISTRY
+
+
+def init_app(app, engines):
+  # `engines` returns {bind name: engine} of the pools to report
+  app.jinja_env.template_class = TimedTemplate
+
+  @app.before_request
+  def start_metrics_timer():
+    g.setdefault('metrics_started', time.perf_counter())
+
+  @app.after_request
+  def record_request_metrics(response):
+    if 'metrics_started' not in g:
+      return response
+    endpoint = request.endpoint or 'none'
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - g.metrics_started)
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    queries = querystats.current_queries()
+    if queries is not None:
+      REQUEST_DB_TIME.labels(endpoint).observe(queries.seconds)
+      REQUEST_QUERIES.labels(endpoint).observe(queries.count)
+    _collect_pools(engines())
+    if 'page_cache' in app.extensions:
+      _collect_page_cache(app.extensions['page_cache'])
+    return response
+
+  @app.route('/metrics')
+  def metrics():
+    return Response(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -72,6 +72,11 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the trigram indexes exist only where pg_trgm does (see 8f3c2a6e91b7)
+    # and are not declared on the models; autogenerate must not drop them
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'index' and reflected and compare_to is None and name.endswith('_trgm'))
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix='sqlalchemy.',
@@ -83,6 +88,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
@@ -0,0 +1,36 @@
+"""show counters on Venue and Artist
+
+Revision ID: 5b2e9c1d7a40
+Revises: 4303e8fe15ab
+Create Date: 2026-10-17 10:12:31.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9c1d7a40'
+down_revision = '4303e8fe15ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, owner_column in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+
+        # backfill from existing shows
+        op.execute(
+            'UPDATE "{table}" SET '
+            'upcoming_shows_count = (SELECT count(*) FROM "Show" WHERE "Show".{owner} = "{table}".id AND "Show".start_time > now()), '
+            'past_shows_count = (SELECT count(*) FROM "Show" WHERE "Show".{owner} = "{table}".id AND "Show".start_time <= now())'
+            .format(table=table, owner=owner_column)
+        )
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
@@ -0,0 +1,54 @@
+"""full-text search vectors on Venue and Artist
+
+Revision ID: 9e61f4a0c3d2
+Revises: c41d0b7e25f9
+Create Date: 2026-10-17 13:21:40.660193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9e61f4a0c3d2'
+down_revision = 'c41d0b7e25f9'
+branch_labels = None
+depends_on = None
+
+# Venue and Artist share the searched column names, so one trigger function
+# serves both tables. Must stay in sync with search.SEARCH_CONFIG.
+SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION fyyur_search_vector_update() RETURNS trigger AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(array_to_string(NEW.genres, ' '), '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(NEW.seeking_description, '')), 'D');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    op.execute(SEARCH_VECTOR_FUNCTION)
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute(
+            'CREATE TRIGGER "{table}_search_vector_update" '
+            'BEFORE INSERT OR UPDATE OF name, city, state, genres, seeking_description ON "{table}" '
+            'FOR EACH ROW EXECUTE PROCEDURE fyyur_search_vector_update()'.format(table=table)
+        )
+        # fire the trigger once for existing rows
+        op.execute('UPDATE "{table}" SET name = name'.format(table=table))
+        op.create_index('ix_%s_search_vector' % table, table, ['search_vector'], postgresql_using='gin')
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_%s_search_vector' % table, table_name=table)
+        op.execute('DROP TRIGGER "{table}_search_vector_update" ON "{table}"'.format(table=table))
+        op.drop_column(table, 'search_vector')
+    op.execute('DROP FUNCTION fyyur_search_vector_update()')
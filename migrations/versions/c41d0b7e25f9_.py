@@ -0,0 +1,24 @@
+"""index for keyset pagination of shows
+
+Revision ID: c41d0b7e25f9
+Revises: 8f3c2a6e91b7
+Create Date: 2026-10-17 11:48:05.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d0b7e25f9'
+down_revision = '8f3c2a6e91b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
@@ -0,0 +1,30 @@
+"""updated_at version stamps on Venue, Artist and Show
+
+Revision ID: d7a83f5b6e12
+Revises: 9e61f4a0c3d2
+Create Date: 2026-10-17 15:37:12.845901
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a83f5b6e12'
+down_revision = '9e61f4a0c3d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # clock_timestamp(), not now(): the moment of the write rather than the start
+    # of its transaction; see the updated_at columns in models.py
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('clock_timestamp()'), nullable=False))
+        op.create_index('ix_%s_updated_at' % table, table, ['updated_at'])
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_index('ix_%s_updated_at' % table, table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,207 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timezone
+import dateutil.parser
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from routing import RoutingSQLAlchemy
+
+# bound to the app in app.py with db.init_app(app); sessions send the reads of
+# @replica views to the read replica (see routing.py)
+db = RoutingSQLAlchemy()
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+      # ix_Venue_name_trgm (name ILIKE '%term%') is not declared here: it needs
+      # pg_trgm, and migration 8f3c2a6e91b7 only creates it where that exists
+      db.Index('ix_Venue_search_vector', 'search_vector', postgresql_using='gin'),
+      db.Index('ix_Venue_updated_at', 'updated_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+
+    # DONE: implement any missing fields, as a database migration using Flask-Migrate
+    genres = db.Column(db.ARRAY(db.String()))
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, default=False)
+    seeking_description = db.Column(db.String(500), default='')
+    shows = db.relationship('Show', backref='Venue', lazy='dynamic')
+
+    # denormalized show counters, kept current by the Show insert/delete
+    # listeners below and rolled forward by `flask refresh-show-counts`
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # maintained by a database trigger, see search.py
+    search_vector = db.deferred(db.Column(TSVECTOR))
+
+    # version stamp for ETag/Last-Modified, bumped on every write to the row;
+    # clock_timestamp(), not now(), which is when the transaction began: a
+    # long transaction committing late would stamp its rows in the past
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.clock_timestamp(), onupdate=func.clock_timestamp())
+
+    def __repr__(self):
+      return str({
+        'id': self.id,
+        'name': self.name,
+        'city': self.city,
+        'state': self.state,
+        'address': self.address,
+        'phone': self.phone,
+        'image_link': self.image_link,
+        'facebook_link': self.facebook_link,
+        'genres': self.genres,
+        'website': self.website,
+        'seeking_talent': self.seeking_talent,
+        'seeking_description': self.seeking_description,
+        'upcoming_shows_count': self.upcoming_shows_count,
+        'past_shows_count': self.past_shows_count
+      })
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+      # ix_Artist_name_trgm (name ILIKE '%term%') is not declared here: it needs
+      # pg_trgm, and migration 8f3c2a6e91b7 only creates it where that exists
+      db.Index('ix_Artist_search_vector', 'search_vector', postgresql_using='gin'),
+      db.Index('ix_Artist_updated_at', 'updated_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.Column(db.ARRAY(db.String()))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+
+    # DONE: implement any missing fields, as a database migration using Flask-Migrate
+    website = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, default=False)
+    seeking_description = db.Column(db.String(500), default='')
+    shows = db.relationship('Show', backref='Artist', lazy=True)
+
+    # denormalized show counters, kept current by the Show insert/delete
+    # listeners below and rolled forward by `flask refresh-show-counts`
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # maintained by a database trigger, see search.py
+    search_vector = db.deferred(db.Column(TSVECTOR))
+
+    # version stamp for ETag/Last-Modified, bumped on every write to the row;
+    # clock_timestamp(), not now(), which is when the transaction began: a
+    # long transaction committing late would stamp its rows in the past
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.clock_timestamp(), onupdate=func.clock_timestamp())
+
+    def __repr__(self):
+      return str({
+        'id': self.id,
+        'name': self.name,
+        'city': self.city,
+        'state': self.state,
+        'phone': self.phone,
+        'genres': self.genres,
+        'image_link': self.image_link,
+        'facebook_link': self.facebook_link,
+        'website': self.website,
+        'seeking_venue': self.seeking_venue,
+        'seeking_description': self.seeking_description,
+        'upcoming_shows_count': self.upcoming_shows_count,
+        'past_shows_count': self.past_shows_count
+      })
+
+# DONE: Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+class Show(db.Model):
+  __tablename__ = 'Show'
+  __table_args__ = (
+    # detail pages filter on (venue_id|artist_id, start_time)
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    # /shows pages through (start_time, id)
+    db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    db.Index('ix_Show_updated_at', 'updated_at'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True)
+  venue_id = db.Column(db.Integer, db.ForeignKey(Venue.id), nullable=False)
+  artist_id = db.Column(db.Integer, db.ForeignKey(Artist.id), nullable=False)
+  start_time = db.Column(db.DateTime(timezone=True))
+
+  # version stamp for ETag/Last-Modified
+  updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.clock_timestamp(), onupdate=func.clock_timestamp())
+
+  def __repr__(self):
+    return str({
+      'id': self.id,
+      'venue_id': self.venue_id,
+      'artist_id': self.artist_id,
+      'start_time': self.start_time,
+    })
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+def is_upcoming(start_time):
+  if start_time is None:
+    return None
+  if isinstance(start_time, str):
+    start_time = dateutil.parser.parse(start_time)
+  if start_time.tzinfo is None:
+    return start_time > datetime.now()
+  return start_time > datetime.now(timezone.utc)
+
+def _adjust_show_counts(connection, show, delta):
+  upcoming = is_upcoming(show.start_time)
+  if upcoming is None:
+    return
+  column = 'upcoming_shows_count' if upcoming else 'past_shows_count'
+  for model, owner_id in ((Venue, show.venue_id), (Artist, show.artist_id)):
+    table = model.__table__
+    connection.execute(
+      table.update()
+        .where(table.c.id == owner_id)
+        .values({column: table.c[column] + delta, 'updated_at': func.clock_timestamp()})
+    )
+
+@event.listens_for(Show, 'after_insert')
+def _count_inserted_show(mapper, connection, target):
+  _adjust_show_counts(connection, target, 1)
+
+@event.listens_for(Show, 'after_delete')
+def _count_deleted_show(mapper, connection, target):
+  _adjust_show_counts(connection, target, -1)
+
+def refresh_show_counts(venue_ids=None, artist_ids=None):
+  # Recomputes the counters from the Show table with one correlated UPDATE
+  # per model, moving shows whose start_time has passed from upcoming to past.
+  # Limited to the given ids when provided; the caller commits.
+  current_time = datetime.now(timezone.utc)
+  for model, owner_column, ids in ((Venue, Show.venue_id, venue_ids), (Artist, Show.artist_id, artist_ids)):
+    table = model.__table__
+    shows = select([func.count(Show.id)]).where(owner_column == table.c.id)
+    upcoming = shows.where(Show.start_time > current_time).as_scalar()
+    past = shows.where(Show.start_time <= current_time).as_scalar()
+    # only rows whose counts changed are written (and get a new updated_at)
+    update = table.update()\
+      .values(upcoming_shows_count=upcoming, past_shows_count=past, updated_at=func.clock_timestamp())\
+      .where(or_(table.c.upcoming_shows_count != upcoming, table.c.past_shows_count != past))
+    if ids is not None:
+      update = update.where(table.c.id.in_(list(ids)))
+    db.session.execute(update)
@@ -0,0 +1,54 @@
+#----------------------------------------------------------------------------#
+# Keyset (seek) pagination.
+#
+# Pages are addressed by an opaque cursor holding the sort key of the last
+# row shown, so fetching page N costs the same as fetching page 1 instead of
+# growing with an OFFSET.
+#----------------------------------------------------------------------------#
+
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+  pass
+
+
+def encode_cursor(*values):
+  values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+  return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+  # returns the raw key values; datetimes come back as ISO strings
+  try:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+  except (ValueError, TypeError) as e:
+    raise InvalidCursor(str(e))
+  if not isinstance(values, list) or len(values) != size:
+    raise InvalidCursor('cursor must hold %d values' % size)
+  return values
+
+
+class KeysetPage(object):
+  # Wraps rows fetched with `limit + 1`: iterating yields at most `limit` rows
+  # and, once the extra row shows that more exist, sets `next_cursor` from the
+  # key of the last row yielded. Rows are consumed lazily, so the page can be
+  # handed to a streamed template; `next_cursor` is only final after iteration.
+
+  def __init__(self, rows, limit, key):
+    self._rows = rows
+    self.limit = limit
+    self.key = key
+    self.next_cursor = None
+
+  def __iter__(self):
+    last = None
+    for index, row in enumerate(self._rows):
+      if index == self.limit:
+        self.next_cursor = encode_cursor(*self.key(last))
+        break
+      last = row
+      yield row
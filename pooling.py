@@ -0,0 +1,109 @@
+#----------------------------------------------------------------------------#
+# Connection pooling.
+#
+# Builds the engine options from the DB_* settings and provides a QueuePool
+# that measures how long requests wait for a connection and how close the
+# pool is to running out, exposed at /_stats/pool.
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+
+  def __init__(self, *args, **kwargs):
+    super(InstrumentedQueuePool, self).__init__(*args, **kwargs)
+    self._stats_lock = threading.Lock()
+    self.checkouts = 0
+    self.timeouts = 0
+    self.wait_seconds = 0.0
+    self.max_wait_seconds = 0.0
+    self.peak_checked_out = 0
+
+  def _do_get(self):
+    started = time.perf_counter()
+    try:
+      return super(InstrumentedQueuePool, self)._do_get()
+    except exc.TimeoutError:
+      with self._stats_lock:
+        self.timeouts += 1
+      raise
+    finally:
+      waited = time.perf_counter() - started
+      with self._stats_lock:
+        self.checkouts += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+
+  def stats(self):
+    capacity = self.size() + max(self._max_overflow, 0)
+    with self._stats_lock:
+      return {
+        'pool': type(self).__name__,
+        'size': self.size(),
+        'max_overflow': self._max_overflow,
+        'checked_out': self.checkedout(),
+        'idle': self.checkedin(),
+        'overflow': self.overflow(),
+        # share of the connections this worker may open that are in use
+        'saturation': round(self.checkedout() / capacity, 3) if capacity else None,
+        'peak_checked_out': self.peak_checked_out,
+        'checkouts': self.checkouts,
+        'timeouts': self.timeouts,
+        'wait_ms_avg': round(self.wait_seconds * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+        'wait_ms_max': round(self.max_wait_seconds * 1000, 3),
+      }
+
+
+def pool_stats(engine):
+  pool = engine.pool
+  if isinstance(pool, InstrumentedQueuePool):
+    return pool.stats()
+  return {'pool': type(pool).__name__}
+
+
+def engine_options(config):
+  # SQLALCHEMY_ENGINE_OPTIONS for the DB_* settings
+  timeout = config['DB_STATEMENT_TIMEOUT']
+  if config['DB_PGBOUNCER']:
+    # PgBouncer pools the server connections and rejects the `options`
+    # startup parameter, so the timeout is set in every transaction instead
+    return {
+      'poolclass': NullPool,
+      'execution_options': {'local_statement_timeout': timeout},
+    }
+  options = {
+    'poolclass': InstrumentedQueuePool,
+    'pool_size': config['DB_POOL_SIZE'],
+    'max_overflow': config['DB_MAX_OVERFLOW'],
+    'pool_timeout': config['DB_POOL_TIMEOUT'],
+    'pool_recycle': config['DB_POOL_RECYCLE'],
+    'pool_pre_ping': config['DB_POOL_PRE_PING'],
+  }
+  if timeout:
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).get_driver_name() == 'psycopg2':
+      # libpq's `options` startup parameter sets it once per connection
+      options['connect_args'] = {'options': '-c statement_timeout=%d' % timeout}
+    else:
+      # other drivers take no `options` argument
+      options['execution_options'] = {'local_statement_timeout': timeout}
+  return options
+
+
+@event.listens_for(Engine, 'begin')
+def _set_local_statement_timeout(conn):
+  # issued on the raw cursor, so it stays out of the per-view query counts
+  timeout = conn.get_execution_options().get('local_statement_timeout')
+  if timeout:
+    cursor = conn.connection.cursor()
+    try:
+      cursor.execute('SET LOCAL statement_timeout = %d' % int(timeout))
+    finally:
+      cursor.close()
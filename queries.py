@@ -0,0 +1,239 @@
+#----------------------------------------------------------------------------#
+# Read queries.
+#
+# The listing, shows and detail queries shared by the HTML views and the
+# JSON API. They select plain columns, so rows come back as lightweight
+# keyed tuples instead of ORM instances with identity-map bookkeeping.
+#----------------------------------------------------------------------------#
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import groupby
+
+from sqlalchemy import tuple_
+
+from models import db, Venue, Artist, Show
+from pagination import InvalidCursor, KeysetPage, decode_cursor
+from search import ranked_query
+from viewmodels import ArtistDetail, ArtistShow, VenueDetail, VenueShow
+
+# public field name -> column, in the order fields are listed
+VENUE_FIELDS = OrderedDict([
+  ('id', Venue.id),
+  ('name', Venue.name),
+  ('genres', Venue.genres),
+  ('address', Venue.address),
+  ('city', Venue.city),
+  ('state', Venue.state),
+  ('phone', Venue.phone),
+  ('website', Venue.website),
+  ('facebook_link', Venue.facebook_link),
+  ('seeking_talent', Venue.seeking_talent),
+  ('seeking_description', Venue.seeking_description),
+  ('image_link', Venue.image_link),
+  ('upcoming_shows_count', Venue.upcoming_shows_count),
+  ('past_shows_count', Venue.past_shows_count),
+])
+
+ARTIST_FIELDS = OrderedDict([
+  ('id', Artist.id),
+  ('name', Artist.name),
+  ('genres', Artist.genres),
+  ('city', Artist.city),
+  ('state', Artist.state),
+  ('phone', Artist.phone),
+  ('website', Artist.website),
+  ('facebook_link', Artist.facebook_link),
+  ('seeking_venue', Artist.seeking_venue),
+  ('seeking_description', Artist.seeking_description),
+  ('image_link', Artist.image_link),
+  ('upcoming_shows_count', Artist.upcoming_shows_count),
+  ('past_shows_count', Artist.past_shows_count),
+])
+
+SHOW_FIELDS = OrderedDict([
+  ('id', Show.id),
+  ('venue_id', Venue.id),
+  ('venue_name', Venue.name),
+  ('venue_image_link', Venue.image_link),
+  ('artist_id', Artist.id),
+  ('artist_name', Artist.name),
+  ('artist_image_link', Artist.image_link),
+  ('start_time', Show.start_time),
+])
+
+SHOW_VIEWS = ('upcoming', 'past', 'all')
+
+# the entity columns the detail view models read
+_VENUE_DETAIL = [column for name, column in VENUE_FIELDS.items() if not name.endswith('_shows_count')]
+_ARTIST_DETAIL = [column for name, column in ARTIST_FIELDS.items() if not name.endswith('_shows_count')]
+
+
+def columns(fields, names=None):
+  # labelled columns for the requested field names (all fields by default)
+  if names is None:
+    names = fields.keys()
+  return [fields[name].label(name) for name in names]
+
+
+#  Statements and what is made of their rows
+#  ----------------------------------------------------------------
+#  The *_query() builders return unexecuted queries, so the ASGI pages (see
+#  views/asyncpages.py) can run the same SQL through their async driver.
+
+def venues_by_area_query():
+  # upcoming show counts are read from the materialized counter column
+  return db.session.query(
+    Venue.id,
+    Venue.name,
+    Venue.city,
+    Venue.state,
+    Venue.upcoming_shows_count.label('num_upcoming_shows'))\
+    .order_by(Venue.city, Venue.state, Venue.id)
+
+
+def group_by_area(venues):
+  # rows arrive sorted by city and state, so each area is one consecutive run
+  return [{
+    'city': city,
+    'state': state,
+    'venues': [{
+      'id': venue.id,
+      'name': venue.name,
+      'num_upcoming_shows': venue.num_upcoming_shows
+    } for venue in area_venues]
+  } for (city, state), area_venues in groupby(venues, key=lambda venue: (venue.city, venue.state))]
+
+
+def venues_by_area():
+  return group_by_area(venues_by_area_query().all())
+
+
+def venue_search_query(term, limit):
+  return ranked_query(
+    db.session.query(
+      Venue.id,
+      Venue.name,
+      Venue.upcoming_shows_count.label('num_upcoming_shows')),
+    Venue, term, limit)
+
+
+def artist_search_query(term, limit):
+  return ranked_query(db.session.query(Artist.id, Artist.name), Artist, term, limit)
+
+
+def page_by_id(model, selected, limit, after=None):
+  # one keyset page of `selected` columns ordered by id; `selected` must
+  # include the id labelled 'id'. Raises InvalidCursor for a bad `after`.
+  query = db.session.query(*selected)
+  if after:
+    (after_id,) = decode_cursor(after, 1)
+    if not isinstance(after_id, int):
+      raise InvalidCursor('id must be an integer')
+    query = query.filter(model.id > after_id)
+  query = query.order_by(model.id).limit(limit + 1)
+  return KeysetPage(query, limit, key=lambda row: (row.id,))
+
+
+def shows_page_query(when, limit, after=None, selected=None):
+  # one keyset page of (start_time, id), plus one row telling whether more
+  # follow; upcoming pages run forwards from now, past pages backwards.
+  # Raises InvalidCursor for a bad `after`.
+  if when not in SHOW_VIEWS:
+    raise ValueError('unknown view %r' % when)
+  if selected is None:
+    selected = columns(SHOW_FIELDS)
+
+  query = db.session.query(*selected)\
+    .filter(Show.venue_id == Venue.id)\
+    .filter(Show.artist_id == Artist.id)
+
+  current_time = datetime.now(timezone.utc)
+  descending = when == 'past'
+  if when == 'upcoming':
+    query = query.filter(Show.start_time > current_time)
+  elif when == 'past':
+    query = query.filter(Show.start_time <= current_time)
+  else:
+    query = query.filter(Show.start_time.isnot(None))
+
+  if after:
+    start_time, show_id = decode_cursor(after, 2)
+    try:
+      start_time, show_id = datetime.fromisoformat(start_time), int(show_id)
+    except (ValueError, TypeError) as e:
+      raise InvalidCursor(str(e))
+    key = tuple_(Show.start_time, Show.id)
+    query = query.filter(key < tuple_(start_time, show_id) if descending else key > tuple_(start_time, show_id))
+
+  if descending:
+    query = query.order_by(Show.start_time.desc(), Show.id.desc())
+  else:
+    query = query.order_by(Show.start_time, Show.id)
+  return query.limit(limit + 1)
+
+
+def shows_keyset(rows, limit):
+  return KeysetPage(rows, limit, key=lambda show: (show.start_time, show.id))
+
+
+def shows_page(when, limit, after=None, selected=None, stream=False):
+  query = shows_page_query(when, limit, after, selected)
+  # streamed pages pull rows from the cursor while the response is being sent
+  return shows_keyset(query.yield_per(100) if stream else query.all(), limit)
+
+
+def venue_detail_query(venue_id):
+  # the venue and all of its shows in one round trip
+  return db.session.query(
+    *_VENUE_DETAIL,
+    Artist.id.label('artist_id'),
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.start_time)\
+    .outerjoin(Show, Show.venue_id == Venue.id)\
+    .outerjoin(Artist, Artist.id == Show.artist_id)\
+    .filter(Venue.id == venue_id)\
+    .order_by(Show.start_time)
+
+
+def venue_from_rows(rows):
+  # the VenueDetail of venue_detail_query() rows, or None
+  if not rows:
+    return None
+  shows = [VenueShow(row.artist_id, row.artist_name, row.artist_image_link, row.start_time)
+           for row in rows if row.artist_id is not None]
+  return VenueDetail(rows[0], shows, datetime.now(timezone.utc))
+
+
+def artist_detail_query(artist_id):
+  # the artist and all of its shows in one round trip
+  return db.session.query(
+    *_ARTIST_DETAIL,
+    Venue.id.label('venue_id'),
+    Venue.name.label('venue_name'),
+    Venue.image_link.label('venue_image_link'),
+    Show.start_time)\
+    .outerjoin(Show, Show.artist_id == Artist.id)\
+    .outerjoin(Venue, Venue.id == Show.venue_id)\
+    .filter(Artist.id == artist_id)\
+    .order_by(Show.start_time)
+
+
+def artist_from_rows(rows):
+  # the ArtistDetail of artist_detail_query() rows, or None
+  if not rows:
+    return None
+  shows = [ArtistShow(row.venue_id, row.venue_name, row.venue_image_link, row.start_time)
+           for row in rows if row.venue_id is not None]
+  return ArtistDetail(rows[0], shows, datetime.now(timezone.utc))
+
+
+def venue_detail(venue_id):
+  # the venue and all of its shows, or None
+  return venue_from_rows(venue_detail_query(venue_id).all())
+
+
+def artist_detail(artist_id):
+  # the artist and all of its shows, or None
+  return artist_from_rows(artist_detail_query(artist_id).all())
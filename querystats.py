@@ -0,0 +1,180 @@
+#----------------------------------------------------------------------------#
+# SQL statement counting.
+#
+# Every statement sent through any SQLAlchemy engine is recorded against the
+# counters active on the current thread, so a view can declare how many round
+# trips it is allowed to make and a regression (e.g. back to one COUNT per
+# row) fails loudly instead of quietly slowing the page down.
+#
+# init_app() also times the statements of every request: the totals go out
+# in a Server-Timing header, and requests slower than SLOW_REQUEST_MS (or
+# running a statement slower than SLOW_QUERY_MS) are logged as one JSON
+# line with their slowest statements.
+#----------------------------------------------------------------------------#
+
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+  pass
+
+
+class RequestQueries(object):
+  # statements of one request: how many, their total time and the `keep`
+  # slowest (a min-heap of (seconds, n, statement))
+
+  __slots__ = ('count', 'seconds', 'slowest', 'keep')
+
+  def __init__(self, keep):
+    self.count = 0
+    self.seconds = 0.0
+    self.slowest = []
+    self.keep = keep
+
+  def add(self, statement, seconds):
+    self.count += 1
+    self.seconds += seconds
+    if len(self.slowest) < self.keep:
+      heapq.heappush(self.slowest, (seconds, self.count, statement))
+    elif self.slowest and seconds > self.slowest[0][0]:
+      heapq.heapreplace(self.slowest, (seconds, self.count, statement))
+
+  def slowest_first(self):
+    return [(seconds, statement) for seconds, _, statement in sorted(self.slowest, reverse=True)]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+  for statements in getattr(_local, 'active', ()):
+    statements.append(statement)
+  if getattr(_local, 'request', None) is not None:
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+  queries = getattr(_local, 'request', None)
+  started = getattr(context, '_query_started', None)
+  if queries is not None and started is not None:
+    queries.add(statement, time.perf_counter() - started)
+
+
+@contextmanager
+def count_queries():
+  # yields the list of statements executed inside the block
+  active = _local.__dict__.setdefault('active', [])
+  statements = []
+  active.append(statements)
+  try:
+    yield statements
+  finally:
+    # by identity: nested counters may hold equal lists
+    del active[next(index for index, entry in enumerate(active) if entry is statements)]
+
+
+def _budget_error(limit, statements):
+  return QueryBudgetExceeded(
+    'Expected at most %d queries, %d were executed:\n%s'
+    % (limit, len(statements), '\n'.join(statements))
+  )
+
+
+def query_budget(limit):
+  # Decorates a view with a maximum number of SQL statements. The budget is
+  # enforced (raising) under DEBUG/TESTING and only logged otherwise.
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      with count_queries() as statements:
+        rv = view(*args, **kwargs)
+      if len(statements) > limit:
+        error = _budget_error(limit, statements)
+        if current_app.debug or current_app.testing:
+          raise error
+        current_app.logger.warning('%s: %s', view.__name__, error)
+      return rv
+    return wrapper
+  return decorator
+
+
+#  Per-request timing
+#  ----------------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+  # one JSON object per line; the `fields` passed in `extra` become keys
+
+  def format(self, record):
+    payload = {
+      'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+      'level': record.levelname,
+      'logger': record.name,
+      'message': record.getMessage(),
+    }
+    payload.update(getattr(record, 'fields', {}))
+    if record.exc_info:
+      payload['exception'] = self.formatException(record.exc_info)
+    return json.dumps(payload, default=str)
+
+
+def _slow_request_fields(response, queries, total):
+  return {
+    'method': request.method,
+    'path': request.full_path.rstrip('?'),
+    'endpoint': request.endpoint,
+    'status': response.status_code,
+    'duration_ms': round(total * 1000, 1),
+    'db_ms': round(queries.seconds * 1000, 1),
+    'queries': queries.count,
+    'slowest': [{'ms': round(seconds * 1000, 1), 'statement': statement[:1000]}
+                for seconds, statement in queries.slowest_first()],
+  }
+
+
+def current_queries():
+  # the RequestQueries of the request being handled, or None
+  return getattr(_local, 'request', None)
+
+
+def init_app(app):
+  # Times the SQL of every request. Costs two perf_counter() calls per
+  # statement, so it stays on in production.
+
+  @app.before_request
+  def start_request_timing():
+    # the ASGI pages (views/asyncpages.py) start the clock and run their
+    # statements before dispatching, and hand both over in g
+    g.setdefault('request_started', time.perf_counter())
+    _local.request = g.pop('request_queries', None) or RequestQueries(app.config['SLOW_QUERIES_LOGGED'])
+
+  @app.after_request
+  def finish_request_timing(response):
+    # statements run while a streamed body is sent afterwards are not included
+    queries = getattr(_local, 'request', None)
+    if queries is None or 'request_started' not in g:
+      return response
+    total = time.perf_counter() - g.request_started
+    if app.config['SERVER_TIMING']:
+      response.headers.add('Server-Timing', 'db;dur=%.1f;desc="%d queries", app;dur=%.1f' % (
+        queries.seconds * 1000, queries.count, total * 1000))
+
+    slow_query = queries.slowest and queries.slowest_first()[0][0] * 1000 >= app.config['SLOW_QUERY_MS']
+    if total * 1000 >= app.config['SLOW_REQUEST_MS'] or slow_query:
+      app.logger.warning('slow request', extra={'fields': _slow_request_fields(response, queries, total)})
+    return response
+
+  @app.teardown_request
+  def stop_request_timing(exc):
+    _local.request = None
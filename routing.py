@@ -0,0 +1,115 @@
+#----------------------------------------------------------------------------#
+# Read-replica routing.
+#
+# Views decorated with @replica run their queries against the 'replica' bind
+# (DATABASE_REPLICA_URL); everything else, and every flush, goes to the
+# primary. A client that just wrote (any POST/PUT/PATCH/DELETE) reads from
+# the primary for REPLICA_STICKY_SECONDS afterwards, so the page it is
+# redirected to after e.g. edit_venue_submission shows its own change even
+# while the replica lags behind.
+#----------------------------------------------------------------------------#
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'read_primary_until'
+
+
+def replica_configured(app):
+  return REPLICA in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def engines(app):
+  # the connection pools of this worker, by bind
+  db = get_state(app).db
+  pools = {'primary': db.get_engine(app)}
+  if replica_configured(app):
+    pools[REPLICA] = db.get_engine(app, bind=REPLICA)
+  return pools
+
+
+def _use_replica():
+  return has_request_context() and g.get('use_replica', False)
+
+
+class RoutingSession(SignallingSession):
+
+  def get_bind(self, mapper=None, clause=None):
+    if not self._flushing and _use_replica():
+      return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+    return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def replica(view):
+  # Reads of the decorated view (and of the decorators inside this one) go
+  # to the replica unless the client is within its read-your-writes window.
+  # The choice holds for the rest of the request, so streamed responses keep
+  # reading from the same database.
+  @wraps(view)
+  def wrapper(*args, **kwargs):
+    # searches are POSTs but write nothing, they must not make the client sticky
+    g.read_only = True
+    if reads_from_replica():
+      g.use_replica = True
+    return view(*args, **kwargs)
+  return wrapper
+
+
+def reads_from_replica():
+  # whether the reads of this request may go to the replica
+  return replica_configured(current_app) and not _sticky()
+
+
+def reads_own_writes():
+  # whether this request is in its client's read-your-writes window: it reads
+  # from the primary and must not be answered from (or fill) the page cache
+  return replica_configured(current_app) and _sticky()
+
+
+@contextmanager
+def primary():
+  # reads inside the block go to the primary, even in a @replica view
+  use_replica = g.get('use_replica', False)
+  g.use_replica = False
+  try:
+    yield
+  finally:
+    g.use_replica = use_replica
+
+
+def _sticky():
+  try:
+    return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+  except ValueError:
+    return False
+
+
+def init_app(app):
+  # adds the replica bind when DATABASE_REPLICA_URL is set and pins writers
+  # to the primary; call before the first query
+  url = app.config.get('DATABASE_REPLICA_URL')
+  if not url:
+    return
+  binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+  binds[REPLICA] = url
+  app.config['SQLALCHEMY_BINDS'] = binds
+
+  @app.after_request
+  def stick_to_primary(response):
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and not g.get('read_only') and response.status_code < 400:
+      seconds = app.config['REPLICA_STICKY_SECONDS']
+      response.set_cookie(STICKY_COOKIE, '%.3f' % (time.time() + seconds), max_age=seconds, httponly=True,
+                          samesite='Lax')
+    return response
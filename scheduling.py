@@ -0,0 +1,137 @@
+#----------------------------------------------------------------------------#
+# Show scheduling.
+#
+# A show books its venue and its artist for SHOW_DURATION seconds from its
+# start time; a new show conflicts with any booking of the same venue or
+# artist that starts less than that before or after it. A batch is checked
+# against the existing bookings with a single range query (served by the
+# (venue_id, start_time) and (artist_id, start_time) indexes) and against
+# its own earlier rows, and every row that fits is inserted in one statement
+# with ids drawn from the sequence beforehand.
+#----------------------------------------------------------------------------#
+
+from bisect import bisect_right, insort
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from itertools import count
+
+from sqlalchemy import and_, or_, text
+
+from models import db, Venue, Artist, Show, refresh_show_counts
+from showrows import resolve, show_values
+
+ScheduleResult = namedtuple('ScheduleResult', ['results', 'venue_ids', 'artist_ids'])
+
+_next_show_ids = text('SELECT nextval(pg_get_serial_sequence(\'"Show"\', \'id\')) FROM generate_series(1, :count)')
+
+
+def _aware(start_time):
+  # naive times are local, as in models.is_upcoming
+  return start_time if start_time.tzinfo is not None else start_time.astimezone()
+
+
+def _lock(model, ids):
+  # Row locks on the venues/artists being booked serialize concurrent
+  # schedulers, so two batches cannot both take the same slot. NO KEY
+  # UPDATE leaves plain show inserts (foreign key checks) unblocked.
+  if ids:
+    db.session.query(model.id).filter(model.id.in_(ids))\
+      .order_by(model.id).with_for_update(key_share=True).all()
+
+
+def _bookings(rows, duration, serial):
+  # (kind, id) -> sorted [(start_time, serial, booking)] of every existing
+  # show that could overlap a row of the batch
+  venue_ids = set(row['venue_id'] for row in rows)
+  artist_ids = set(row['artist_id'] for row in rows)
+  starts = [row['start_time'] for row in rows]
+  existing = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time)\
+    .filter(or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)))\
+    .filter(and_(Show.start_time > min(starts) - duration, Show.start_time < max(starts) + duration))
+
+  bookings = defaultdict(list)
+  for id, venue_id, artist_id, start_time in existing:
+    booking = {'show_id': id, 'start_time': start_time}
+    bookings['venue', venue_id].append((start_time, next(serial), booking))
+    bookings['artist', artist_id].append((start_time, next(serial), booking))
+  for booked in bookings.values():
+    booked.sort()
+  return bookings
+
+
+def _conflicts(bookings, row, duration):
+  conflicts = []
+  for kind in ('venue', 'artist'):
+    booked = bookings.get((kind, row[kind + '_id']), ())
+    # the bookings starting in (start - duration, start + duration)
+    index = bisect_right(booked, (row['start_time'] - duration, float('inf')))
+    while index < len(booked) and booked[index][0] < row['start_time'] + duration:
+      conflicts.append(dict(booked[index][2], on=kind))
+      index += 1
+  return conflicts
+
+
+def schedule_shows(rows, duration):
+  # rows: dicts with venue_id (or venue_name), artist_id (or artist_name)
+  # and start_time. Returns one result per row, in order:
+  #   {'status': 'created', 'id': ...}
+  #   {'status': 'invalid', 'errors': {field: [messages]}}
+  #   {'status': 'conflict', 'conflicts': [{'on': 'venue'|'artist', ...}]}
+  # The caller commits.
+  if not isinstance(duration, timedelta):
+    duration = timedelta(seconds=duration)
+  results = [None] * len(rows)
+  candidates = []
+  for index, row in enumerate(rows):
+    if not isinstance(row, dict):
+      results[index] = {'status': 'invalid', 'errors': {'show': ['Must be an object.']}}
+      continue
+    values, errors = show_values(row)
+    if errors:
+      results[index] = {'status': 'invalid', 'errors': errors}
+    else:
+      values['start_time'] = _aware(values['start_time'])
+      candidates.append((index, values))
+
+  shows = [values for index, values in candidates]
+  unresolved = resolve(Venue, shows, 'venue')
+  for position, errors in resolve(Artist, shows, 'artist').items():
+    unresolved.setdefault(position, {}).update(errors)
+  for position, errors in unresolved.items():
+    results[candidates[position][0]] = {'status': 'invalid', 'errors': errors}
+  candidates = [candidate for position, candidate in enumerate(candidates) if position not in unresolved]
+
+  accepted = []
+  if candidates:
+    shows = [values for index, values in candidates]
+    _lock(Venue, set(show['venue_id'] for show in shows))
+    _lock(Artist, set(show['artist_id'] for show in shows))
+    serial = count()
+    bookings = _bookings(shows, duration, serial)
+    for index, show in candidates:
+      conflicts = _conflicts(bookings, show, duration)
+      if conflicts:
+        results[index] = {'status': 'conflict', 'conflicts': conflicts}
+        continue
+      accepted.append((index, show))
+      # later rows of the batch must not overlap this one either
+      booking = {'row': index, 'start_time': show['start_time']}
+      for kind in ('venue', 'artist'):
+        insort(bookings[kind, show[kind + '_id']], (show['start_time'], next(serial), booking))
+
+  venue_ids = set(show['venue_id'] for index, show in accepted)
+  artist_ids = set(show['artist_id'] for index, show in accepted)
+  if accepted:
+    # ids are drawn from the sequence first and inserted explicitly: the rows
+    # of INSERT ... RETURNING need not come back in the order they were given
+    ids = [id for (id,) in db.session.execute(_next_show_ids, {'count': len(accepted)})]
+    db.session.execute(
+      Show.__table__.insert()
+        .values([dict(id=id, venue_id=show['venue_id'], artist_id=show['artist_id'], start_time=show['start_time'])
+                 for id, (index, show) in zip(ids, accepted)]))
+    for id, (index, show) in zip(ids, accepted):
+      results[index] = {'status': 'created', 'id': id}
+    # the multi-row INSERT bypasses the ORM listeners that keep counters current
+    refresh_show_counts(venue_ids=venue_ids, artist_ids=artist_ids)
+
+  return ScheduleResult(results, venue_ids, artist_ids)
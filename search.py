@@ -0,0 +1,74 @@
+#----------------------------------------------------------------------------#
+# Full-text search.
+#
+# Venue and Artist carry a weighted `search_vector` tsvector (name, then city
+# and state, then genres, then seeking_description) that a database trigger
+# keeps current on every insert and update; see migration 9e61f4a0c3d2.
+#----------------------------------------------------------------------------#
+
+import re
+
+from sqlalchemy import func, literal_column, or_
+
+# 'simple' keeps names intact instead of stemming them as English words
+SEARCH_CONFIG = 'simple'
+
+_token_re = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def to_prefix_tsquery(term):
+  # "musical ho" -> "musical:* & ho:*", so partial words still match
+  tokens = _token_re.findall(term.lower())
+  if not tokens:
+    return None
+  return func.to_tsquery(SEARCH_CONFIG, ' & '.join(token + ':*' for token in tokens))
+
+
+def ranked_query(query, model, term, limit):
+  # Narrows `query` (already selecting the wanted columns of `model`, among
+  # them its id and name) to the rows matching every word of `term` as a
+  # word prefix, best ranked first. A single word also matches anywhere in
+  # the name, as the original ILIKE search did ("a" finds "Guns N Petals"),
+  # served by the trigram index where pg_trgm is installed. A term without
+  # any words lists everything. Each row carries the number of matches as
+  # `total`, counted up to limit + 1 only: more than `limit` is all a page
+  # says about the rest.
+  tokens = _token_re.findall(term.lower())
+  tsquery = to_prefix_tsquery(term)
+
+  if tsquery is None:
+    rank = literal_column('0')
+  else:
+    matches = model.search_vector.op('@@')(tsquery)
+    if len(tokens) == 1:
+      # tokens are letters and digits, nothing for ILIKE to escape
+      matches = or_(matches, model.name.ilike('%' + tokens[0] + '%'))
+    query = query.filter(matches)
+    rank = func.ts_rank(model.search_vector, tsquery)
+
+  rank = rank.label('rank')
+  found = query.add_columns(rank)\
+    .order_by(rank.desc(), model.name, model.id)\
+    .limit(limit + 1)\
+    .subquery()
+  return query.session.query(*[column for column in found.c if column.name != 'rank'])\
+    .add_columns(func.count().over().label('total'))\
+    .order_by(found.c.rank.desc(), found.c.name, found.c.id)\
+    .limit(limit)
+
+
+def result_total(rows):
+  # the number of matches, counted up to the limit + 1
+  return rows[0].total if rows else 0
+
+
+def result_count(rows, limit):
+  # the number of matches as a results page shows it: "50+" past the limit
+  total = result_total(rows)
+  return '%d+' % limit if total > limit else total
+
+
+def ranked_search(query, model, term, limit):
+  # ranked_query() run, as (rows, total counted up to limit + 1)
+  rows = ranked_query(query, model, term, limit).all()
+  return rows, result_total(rows)
@@ -0,0 +1,80 @@
+#----------------------------------------------------------------------------#
+# Show rows from outside the web forms.
+#
+# Parsing and checking of the shows read by the bulk importer and booked
+# through /api/v1/shows/batch. Nothing here needs WTForms, so the API and
+# scheduling.py load it at startup without the importer and its forms.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+import dateutil.parser
+from sqlalchemy import func
+
+from models import db
+
+
+def present(row):
+  # the non-empty input values; absent optional fields are stored as NULL
+  return {name: value for name, value in row.items() if value not in (None, '', [])}
+
+
+def parse_datetime(value):
+  # ISO 8601 through the C parser, anything else through dateutil
+  value = str(value)
+  try:
+    return datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+  except ValueError:
+    return dateutil.parser.parse(value)
+
+
+def show_values(row):
+  row = present(row)
+  errors = {}
+  try:
+    start_time = parse_datetime(row['start_time'])
+  except KeyError:
+    errors['start_time'] = ['This field is required.']
+  except (ValueError, OverflowError):
+    errors['start_time'] = ['Not a valid datetime value']
+  else:
+    row['start_time'] = start_time
+  for kind in ('venue', 'artist'):
+    if kind + '_id' in row:
+      try:
+        row[kind + '_id'] = int(row[kind + '_id'])
+      except (TypeError, ValueError):
+        errors[kind + '_id'] = ['Not a valid integer value']
+    elif kind + '_name' not in row:
+      errors[kind + '_id'] = ['Either %s_id or %s_name is required.' % (kind, kind)]
+  return row, errors
+
+
+def resolve(model, rows, kind):
+  # fills in <kind>_id for one chunk of shows: names are looked up and ids
+  # checked for existence with one query; returns {index: errors}
+  id_key, name_key = kind + '_id', kind + '_name'
+  ids = set(row[id_key] for row in rows if id_key in row)
+  names = set(row[name_key] for row in rows if id_key not in row and name_key in row)
+  known_ids = set()
+  by_name = {}
+  if ids:
+    known_ids = set(id for (id,) in db.session.query(model.id).filter(model.id.in_(ids)))
+  if names:
+    by_name = dict(
+      (name, (id, count)) for name, id, count in
+      db.session.query(model.name, func.min(model.id), func.count(model.id))
+        .filter(model.name.in_(names)).group_by(model.name))
+
+  errors = {}
+  for index, row in enumerate(rows):
+    if id_key in row:
+      if row[id_key] not in known_ids:
+        errors[index] = {id_key: ['No %s with id %s' % (kind, row[id_key])]}
+      continue
+    id, count = by_name.get(row[name_key], (None, 0))
+    if count != 1:
+      errors[index] = {name_key: ['%s %s named %r' % ('No' if not count else 'Several', kind, row[name_key])]}
+    else:
+      row[id_key] = id
+  return errors
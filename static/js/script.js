@@ -2,3 +2,38 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// search-as-you-type: fill the search box datalist from /search/suggest
+document.querySelectorAll('input[data-suggest]').forEach(function (input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var timer = null;
+  var lastQuery = '';
+
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      var query = input.value.trim();
+      if (query === lastQuery) {
+        return;
+      }
+      lastQuery = query;
+      if (!query) {
+        list.innerHTML = '';
+        return;
+      }
+      fetch('/search/suggest?type=' + input.dataset.suggest + '&q=' + encodeURIComponent(query))
+        .then(function (response) { return response.json(); })
+        .then(function (matches) {
+          if (query !== lastQuery) {
+            return;
+          }
+          list.innerHTML = '';
+          matches.forEach(function (match) {
+            var option = document.createElement('option');
+            option.value = match.name;
+            list.appendChild(option);
+          });
+        });
+    }, 100);
+  });
+});
@@ -0,0 +1,140 @@
+#----------------------------------------------------------------------------#
+# Search-as-you-type suggestions.
+#
+# A sorted in-memory array of folded name keys answers prefix lookups with
+# bisect, without a database round trip. Every word of a name gets its own
+# key ("the musical hop", "musical hop", "hop"), so typing "mus" finds
+# "The Musical Hop". Views keep it current on create/edit/delete; since each
+# worker process holds its own copy, it is also rebuilt from the database
+# once it is older than `max_age` seconds to pick up other workers' writes.
+# That rebuild runs in a background thread while lookups go on reading the
+# old array. The first build is made by warm_up() before the worker takes
+# traffic; without it (WARM_UP off), the first lookup waits for it.
+#----------------------------------------------------------------------------#
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+
+def _keys(name):
+  words = (name or '').casefold().split()
+  return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex(object):
+
+  def __init__(self, loader, max_age=None, context=nullcontext):
+    # loader() yields (kind, id, name) for every suggestible row; background
+    # rebuilds call it inside context() (e.g. app.app_context)
+    self._loader = loader
+    self.max_age = max_age
+    self.context = context
+    self._entries = []
+    self._names = {}
+    self._built_at = None
+    # changes made while a build reads the database, replayed onto its result
+    self._pending = None
+    self._lock = threading.Lock()
+    # held by the build in progress: one at a time
+    self._building = threading.Lock()
+
+  def rebuild(self):
+    with self._building:
+      self._rebuild()
+
+  def _rebuild(self):
+    with self._lock:
+      self._pending = []
+    try:
+      entries = []
+      names = {}
+      for kind, id, name in self._loader():
+        names[(kind, id)] = name
+        entries.extend((key, kind, id) for key in _keys(name))
+      entries.sort()
+    except Exception:
+      with self._lock:
+        self._pending = None
+      raise
+    with self._lock:
+      self._entries = entries
+      self._names = names
+      self._built_at = time.monotonic()
+      pending, self._pending = self._pending, None
+      for change in pending:
+        change()
+
+  def _rebuild_in_background(self):
+    try:
+      with self.context():
+        self._rebuild()
+    except Exception:
+      # the old array goes on serving; the next stale lookup tries again
+      logger.exception('rebuilding suggestions failed')
+    finally:
+      self._building.release()
+
+  def _ensure_fresh(self):
+    if self._built_at is None:
+      # nothing to serve yet: concurrent first lookups wait for one build
+      with self._building:
+        if self._built_at is None:
+          self._rebuild()
+    elif self.max_age and time.monotonic() - self._built_at > self.max_age:
+      if self._building.acquire(blocking=False):
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+  def add(self, kind, id, name):
+    # adds or renames; a no-op until the index is first built
+    with self._lock:
+      if self._pending is not None:
+        self._pending.append(lambda: self._add(kind, id, name))
+      if self._built_at is not None:
+        self._add(kind, id, name)
+
+  def _add(self, kind, id, name):
+    self._remove(kind, id)
+    self._names[(kind, id)] = name
+    for key in _keys(name):
+      insort(self._entries, (key, kind, id))
+
+  def remove(self, kind, id):
+    with self._lock:
+      if self._pending is not None:
+        self._pending.append(lambda: self._remove(kind, id))
+      self._remove(kind, id)
+
+  def _remove(self, kind, id):
+    name = self._names.pop((kind, id), None)
+    if name is None:
+      return
+    for key in _keys(name):
+      index = bisect_left(self._entries, (key, kind, id))
+      if index < len(self._entries) and self._entries[index] == (key, kind, id):
+        del self._entries[index]
+
+  def lookup(self, prefix, limit=10, kind=None):
+    # returns up to `limit` (kind, id, name) tuples, ordered by the matched words
+    prefix = ' '.join(prefix.casefold().split())
+    if not prefix:
+      return []
+    self._ensure_fresh()
+    results = []
+    seen = set()
+    with self._lock:
+      index = bisect_left(self._entries, (prefix,))
+      while index < len(self._entries) and len(results) < limit:
+        key, entry_kind, id = self._entries[index]
+        if not key.startswith(prefix):
+          break
+        index += 1
+        if (kind and entry_kind != kind) or (entry_kind, id) in seen:
+          continue
+        seen.add((entry_kind, id))
+        results.append((entry_kind, id, self._names[(entry_kind, id)]))
+    return results
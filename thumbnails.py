@@ -0,0 +1,304 @@
+#----------------------------------------------------------------------------#
+# Image thumbnails.
+#
+# Pages link venue and artist images through the `thumbnail` filter, which
+# points at /thumbnails/<width>/<signature>?src=<image_link>. The first
+# request fetches the source image (through a replaceable fetcher), scales
+# it down to the next width bucket and keeps both in a disk cache bounded
+# in bytes, least recently used first out. Later requests, and other widths
+# of the same image, are served from disk with long-lived caching headers.
+# The signature (an HMAC of the source and width, keyed with
+# THUMBNAIL_SECRET) keeps the endpoint from being used as an open proxy,
+# and sources are only fetched from public addresses.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import hmac
+import http.client
+import io
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
+import urllib.request
+from urllib.parse import urlparse
+
+from flask import abort, current_app, redirect, request, send_file, url_for
+
+# widths thumbnails are made in; a requested width is rounded up to one
+WIDTHS = (160, 320, 480, 640, 960)
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class FetchFailed(Exception):
+  pass
+
+
+def public_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+  # socket.create_connection() for the source images: the host is resolved
+  # here and connected to by the address that was checked, so no name (or
+  # a DNS answer changing in between) reaches loopback, private, link-local
+  # or otherwise non-public addresses
+  host, port = address
+  try:
+    resolved = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+  except socket.gaierror as e:
+    raise FetchFailed('%s: %s' % (host, e))
+  for _, _, _, _, sockaddr in resolved:
+    ip = ipaddress.ip_address(sockaddr[0].split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+      ip = ip.ipv4_mapped
+    if not ip.is_global or ip.is_multicast or ip.is_reserved:
+      raise FetchFailed('%s: %s is not a public address' % (host, ip))
+  return socket.create_connection((resolved[0][4][0], port), timeout, source_address)
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+
+  def __init__(self, *args, **kwargs):
+    super(_PublicHTTPConnection, self).__init__(*args, **kwargs)
+    self._create_connection = public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+
+  def __init__(self, *args, **kwargs):
+    super(_PublicHTTPSConnection, self).__init__(*args, **kwargs)
+    self._create_connection = public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+
+  def http_open(self, req):
+    return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+
+  def https_open(self, req):
+    return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class HttpFetcher(object):
+  # downloads the source image; anything but a complete image of at most
+  # `max_bytes` within `timeout` seconds fails. Every connection, redirects
+  # included, goes to a public address only (see public_connection), and
+  # directly: proxies from the environment are not used.
+
+  def __init__(self, timeout=5, max_bytes=10 * 1024 * 1024):
+    self.timeout = timeout
+    self.max_bytes = max_bytes
+    # http(s) only, also for redirects; any other scheme is an unknown URL type
+    self.opener = urllib.request.OpenerDirector()
+    for handler in (_PublicHTTPHandler(), _PublicHTTPSHandler(), urllib.request.HTTPRedirectHandler(),
+                    urllib.request.HTTPErrorProcessor(), urllib.request.HTTPDefaultErrorHandler(),
+                    urllib.request.UnknownHandler()):
+      self.opener.add_handler(handler)
+
+  def __call__(self, url):
+    if urlparse(url).scheme not in ('http', 'https'):
+      raise FetchFailed('not an http(s) URL: %s' % url)
+    fetch = urllib.request.Request(url, headers={'User-Agent': 'fyyur-thumbnails'})
+    try:
+      with self.opener.open(fetch, timeout=self.timeout) as response:
+        data = response.read(self.max_bytes + 1)
+    except (OSError, ValueError) as e:
+      raise FetchFailed('%s: %s' % (url, e))
+    if len(data) > self.max_bytes:
+      raise FetchFailed('%s: larger than %d bytes' % (url, self.max_bytes))
+    return data
+
+
+class FileFetcher(object):
+  # stand-in for HttpFetcher that reads `directory/<last path segment of the
+  # URL>`, for development and tests without network access
+
+  def __init__(self, directory):
+    self.directory = directory
+
+  def __call__(self, url):
+    name = os.path.basename(urlparse(url).path)
+    try:
+      with open(os.path.join(self.directory, name), 'rb') as f:
+        return f.read()
+    except (OSError, ValueError) as e:
+      raise FetchFailed('%s: %s' % (url, e))
+
+
+class DiskCache(object):
+  # Files in `directory`, evicted least recently used first once they add
+  # up to more than `max_bytes`. Recency is the file's mtime, refreshed on
+  # every hit, so the order survives restarts. Usage is counted from the
+  # directory itself on every write, so the limit holds for all the workers
+  # sharing it; writes are rare next to the fetch and resize before them.
+
+  def __init__(self, directory, max_bytes):
+    self.directory = directory
+    self.max_bytes = max_bytes
+    self._lock = threading.Lock()
+    os.makedirs(directory, exist_ok=True)
+
+  def path(self, name):
+    return os.path.join(self.directory, name)
+
+  def get(self, name):
+    # the file's path, or None
+    path = self.path(name)
+    try:
+      os.utime(path)
+    except FileNotFoundError:
+      return None
+    return path
+
+  def set(self, name, data):
+    # written under a temporary name and renamed, so readers never see half a file
+    fd, temporary = tempfile.mkstemp(dir=self.directory, prefix='.')
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+    os.replace(temporary, self.path(name))
+    with self._lock:
+      entries = self._entries()
+      used = sum(size for _, _, size in entries)
+      # the file just written stays, even when it alone is over the limit;
+      # a file another worker removed first is already gone
+      for _, evicted, size in entries:
+        if used <= self.max_bytes:
+          break
+        if evicted != name:
+          try:
+            os.remove(self.path(evicted))
+          except FileNotFoundError:
+            pass
+          used -= size
+    return self.path(name)
+
+  def _entries(self):
+    # [(mtime, name, size)] of the cached files, least recently used first;
+    # temporary files start with a dot
+    entries = []
+    for entry in os.scandir(self.directory):
+      if not entry.name.startswith('.'):
+        try:
+          stat = entry.stat()
+        except FileNotFoundError:
+          continue
+        entries.append((stat.st_mtime, entry.name, stat.st_size))
+    return sorted(entries)
+
+  def stats(self):
+    entries = self._entries()
+    return {'files': len(entries), 'bytes': sum(size for _, _, size in entries), 'max_bytes': self.max_bytes}
+
+
+class Thumbnails(object):
+
+  def __init__(self, cache, fetcher, secret):
+    self.cache = cache
+    self.fetcher = fetcher
+    self.secret = secret
+    # names the key without revealing it; part of every page's ETag and cache
+    # key (see conditional.page_salt), so a new key never serves old links
+    self.fingerprint = hmac.new(secret, b'fingerprint', hashlib.sha256).hexdigest()[:16]
+    # thumbnails being made are locked by hash, a fixed number of locks
+    # however many images there are
+    self._locks = [threading.Lock() for _ in range(64)]
+
+  def signature(self, src, width):
+    message = ('%d\n%s' % (width, src)).encode('utf-8')
+    return hmac.new(self.secret, message, hashlib.sha256).hexdigest()[:20]
+
+  def source(self, key, src):
+    # the source image bytes, fetched at most once while it stays cached
+    path = self.cache.get(key + '.src')
+    if path is None:
+      data = self.fetcher(src)
+      self.cache.set(key + '.src', data)
+      return data
+    with open(path, 'rb') as f:
+      return f.read()
+
+  def get(self, src, width):
+    # path of the `width` thumbnail of `src`, made on the first request;
+    # concurrent requests for the same one in this worker wait for it
+    key = hashlib.sha1(src.encode('utf-8')).hexdigest()
+    with self._locks[int(key[:8], 16) % len(self._locks)]:
+      for ext in ('.jpg', '.png'):
+        path = self.cache.get('%s-%d%s' % (key, width, ext))
+        if path is not None:
+          return path
+      thumbnail, ext = resize(self.source(key, src), width)
+      return self.cache.set('%s-%d%s' % (key, width, ext), thumbnail)
+
+
+def bucket(width):
+  for size in WIDTHS:
+    if width <= size:
+      return size
+  return WIDTHS[-1]
+
+
+def resize(data, width):
+  # (image bytes, extension): JPEG, or PNG when the source is transparent;
+  # never scaled up
+  from PIL import Image, ImageOps
+  try:
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((width, width * 4), Image.LANCZOS)
+  except (OSError, ValueError, Image.DecompressionBombError) as e:
+    raise FetchFailed('not an image: %s' % e)
+  output = io.BytesIO()
+  if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+    image.save(output, 'PNG', optimize=True)
+    return output.getvalue(), '.png'
+  image.convert('RGB').save(output, 'JPEG', quality=82, optimize=True, progressive=True)
+  return output.getvalue(), '.jpg'
+
+
+def thumbnail_url(src, width):
+  # template filter: the thumbnail URL for an image_link, or the link
+  # itself when thumbnails are off or there is no image
+  thumbnails = current_app.extensions.get('thumbnails')
+  if not src or thumbnails is None:
+    return src
+  width = bucket(width)
+  return url_for('thumbnail', width=width, signature=thumbnails.signature(src, width), src=src)
+
+
+def serve(width, signature):
+  thumbnails = current_app.extensions['thumbnails']
+  src = request.args.get('src', '')
+  if width not in WIDTHS or not hmac.compare_digest(signature, thumbnails.signature(src, width)):
+    abort(404)
+  try:
+    path = thumbnails.get(src, width)
+  except FetchFailed as e:
+    # let the browser try the original; retried here after a while
+    current_app.logger.warning('thumbnail of %s failed: %s', src, e)
+    response = redirect(src)
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+  # the file name names the content; its mtime moves with every hit
+  response = send_file(path, add_etags=False)
+  response.set_etag(os.path.basename(path))
+  response.headers['Cache-Control'] = CACHE_CONTROL
+  return response.make_conditional(request)
+
+
+def init_app(app):
+  app.add_template_filter(thumbnail_url, 'thumbnail')
+  if not app.config['THUMBNAILS_ENABLED']:
+    return
+  secret = app.config['THUMBNAIL_SECRET']
+  if not secret:
+    # a key of this process alone would break the links other workers render
+    app.logger.warning('THUMBNAIL_SECRET is not set; thumbnails are off')
+    return
+  if app.config['THUMBNAIL_SOURCE_DIR']:
+    fetcher = FileFetcher(app.config['THUMBNAIL_SOURCE_DIR'])
+  else:
+    fetcher = HttpFetcher(timeout=app.config['THUMBNAIL_FETCH_TIMEOUT'])
+  cache = DiskCache(app.config['THUMBNAIL_CACHE_DIR'], app.config['THUMBNAIL_CACHE_MAX_BYTES'])
+  app.extensions['thumbnails'] = Thumbnails(cache, fetcher, secret if isinstance(secret, bytes) else secret.encode())
+  app.add_url_rule('/thumbnails/<int:width>/<signature>', 'thumbnail', serve)
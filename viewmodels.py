@@ -0,0 +1,78 @@
+#----------------------------------------------------------------------------#
+# View models.
+#
+# Plain objects handed to the detail templates, so views no longer attach
+# ad-hoc attributes (past_shows, ...) to ORM instances.
+#----------------------------------------------------------------------------#
+
+from collections import namedtuple
+
+# one show as listed on a venue page / on an artist page
+VenueShow = namedtuple('VenueShow', ['artist_id', 'artist_name', 'artist_image_link', 'start_time'])
+ArtistShow = namedtuple('ArtistShow', ['venue_id', 'venue_name', 'venue_image_link', 'start_time'])
+
+
+def partition_shows(shows, current_time):
+  # splits shows into (past, upcoming) against a single captured timestamp,
+  # so a show can never be counted in both lists or in neither
+  past = []
+  upcoming = []
+  for show in shows:
+    if show.start_time is None:
+      continue
+    if show.start_time > current_time:
+      upcoming.append(show)
+    else:
+      past.append(show)
+  return past, upcoming
+
+
+class VenueDetail(object):
+
+  def __init__(self, venue, shows, current_time):
+    self.id = venue.id
+    self.name = venue.name
+    self.genres = venue.genres
+    self.address = venue.address
+    self.city = venue.city
+    self.state = venue.state
+    self.phone = venue.phone
+    self.website = venue.website
+    self.facebook_link = venue.facebook_link
+    self.seeking_talent = venue.seeking_talent
+    self.seeking_description = venue.seeking_description
+    self.image_link = venue.image_link
+    self.past_shows, self.upcoming_shows = partition_shows(shows, current_time)
+
+  @property
+  def past_shows_count(self):
+    return len(self.past_shows)
+
+  @property
+  def upcoming_shows_count(self):
+    return len(self.upcoming_shows)
+
+
+class ArtistDetail(object):
+
+  def __init__(self, artist, shows, current_time):
+    self.id = artist.id
+    self.name = artist.name
+    self.genres = artist.genres
+    self.city = artist.city
+    self.state = artist.state
+    self.phone = artist.phone
+    self.website = artist.website
+    self.facebook_link = artist.facebook_link
+    self.seeking_venue = artist.seeking_venue
+    self.seeking_description = artist.seeking_description
+    self.image_link = artist.image_link
+    self.past_shows, self.upcoming_shows = partition_shows(shows, current_time)
+
+  @property
+  def past_shows_count(self):
+    return len(self.past_shows)
+
+  @property
+  def upcoming_shows_count(self):
+    return len(self.upcoming_shows)
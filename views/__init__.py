@@ -0,0 +1,18 @@
+#----------------------------------------------------------------------------#
+# HTML pages, one blueprint per section; registered by create_app() in app.py.
+# Endpoints are named after their blueprint ('venues.show_venue').
+#----------------------------------------------------------------------------#
+
+from views.artists import artist_pages
+from views.common import init_suggestions
+from views.main import main
+from views.shows import show_pages
+from views.venues import venue_pages
+
+BLUEPRINTS = (main, venue_pages, artist_pages, show_pages)
+
+
+def init_app(app):
+  init_suggestions(app)
+  for blueprint in BLUEPRINTS:
+    app.register_blueprint(blueprint)
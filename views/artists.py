@@ -0,0 +1,193 @@
+#----------------------------------------------------------------------------#
+# Artist pages.
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import cached, page_cache
+from conditional import conditional
+from models import db, Venue, Artist, Show
+from queries import artist_detail, artist_search_query
+from querystats import query_budget
+from routing import replica
+from search import result_count
+from views.common import detail_stamp, listing_stamp, suggestions
+
+# forms.py (WTForms, phonenumbers) is imported by the form views themselves,
+# so a worker only loads it once it serves a form
+
+artist_pages = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@artist_pages.route('/artists')
+@replica
+@conditional(listing_stamp(Artist))
+@cached('artists')
+def artists():
+  # DONE: replace with real data returned from querying the database
+  data = db.session.query(Artist.id, Artist.name).all();
+
+  return render_template('pages/artists.html', artists=data)
+
+@artist_pages.route('/artists/search', methods=['POST'])
+@replica
+@query_budget(1)
+def search_artists():
+  # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  # search for "sax ba" should return "The Wild Sax Band" (every word matched as a prefix).
+
+  search_term = request.form.get('search_term', '');
+  data = artist_search_query(search_term, current_app.config['SEARCH_RESULT_LIMIT']).all()
+
+  return artist_results_page(data, search_term)
+
+def artist_results_page(data, search_term):
+  # also rendered by the ASGI route (see views/asyncpages.py)
+  response = {
+    'count': result_count(data, current_app.config['SEARCH_RESULT_LIMIT']),
+    'data': data,
+  }
+
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+@artist_pages.route('/artists/<int:artist_id>')
+@replica
+@conditional(detail_stamp(Artist, Show.artist_id, Venue, Show.venue_id))
+@cached('artist:{artist_id}')
+@query_budget(1)
+def show_artist(artist_id):
+  # shows the artist page with the given artist_id
+
+  # the artist and all of its shows in one round trip
+  return artist_page(artist_detail(artist_id))
+
+def artist_page(artist):
+  # also rendered by the ASGI route (see views/asyncpages.py)
+  if artist is None:
+    return render_template('errors/404.html')
+
+  page_cache.add_tags(*set('venue:%d' % show.venue_id for show in artist.past_shows + artist.upcoming_shows))
+
+  return render_template('pages/show_artist.html', artist=artist)
+
+#  Update
+#  ----------------------------------------------------------------
+@artist_pages.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm()
+  selected_artist = Artist.query.get(artist_id)
+  if not selected_artist:
+    return render_template('errors/404.html')
+
+  form.name.data = selected_artist.name
+  form.genres.data = selected_artist.genres
+  form.city.data = selected_artist.city
+  form.state.data = selected_artist.state
+  form.phone.data = selected_artist.phone
+  form.website.data = selected_artist.website
+  form.facebook_link.data = selected_artist.facebook_link
+  form.seeking_venue.data = selected_artist.seeking_venue
+  form.seeking_description.data = selected_artist.seeking_description
+  form.image_link.data = selected_artist.image_link
+
+  # DONE: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=selected_artist)
+
+@artist_pages.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # DONE: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+
+  from forms import ArtistForm
+  form = ArtistForm()
+
+  if form.validate():
+    try:
+      artist = Artist.query.get(artist_id)
+      artist.name = request.form['name']
+      artist.genres = request.form.getlist('genres')
+      artist.city = request.form['city']
+      artist.state = request.form['state']
+      artist.phone = request.form['phone']
+      artist.website = request.form['website']
+      artist.facebook_link = request.form['facebook_link']
+      artist.seeking_venue = bool(request.form['seeking_venue'])
+      artist.seeking_description = request.form['seeking_description']
+      artist.image_link = request.form['image_link']
+
+      db.session.commit()
+      suggestions.add('artist', artist_id, request.form['name'])
+      page_cache.invalidate('artists', 'shows', 'artist:%d' % artist_id)
+
+      # on successful db update, flash success
+      flash('Artist ' + request.form['name'] + ' was successfully updated!')
+    except SQLAlchemyError as e:
+      # on unsuccessful db update, flash an error instead.
+      flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated! Please try again later.')
+    finally:
+      db.session.close()
+  else:
+    flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated!')
+    flash(form.errors)
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@artist_pages.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@artist_pages.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # DONE: insert form data as a new Venue record in the db, instead
+  # DONE: modify data to be the data object returned from db insertion
+
+  from forms import ArtistForm
+  form = ArtistForm()
+
+  if form.validate():
+    try:
+      new_artist = Artist(
+        name = request.form['name'],
+        genres = request.form.getlist('genres'),
+        city = request.form['city'],
+        state = request.form['state'],
+        phone = request.form['phone'],
+        website = request.form['website'],
+        facebook_link = request.form['facebook_link'],
+        seeking_venue = bool(request.form['seeking_venue']),
+        seeking_description = request.form['seeking_description'],
+        image_link = request.form['image_link']
+      )
+
+      db.session.add(new_artist)
+      db.session.commit()
+      suggestions.add('artist', new_artist.id, new_artist.name)
+      page_cache.invalidate('artists', 'artist:%d' % new_artist.id)
+
+      # on successful db insert, flash success
+      flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    except SQLAlchemyError as e:
+      # DONE: on unsuccessful db insert, flash an error instead.
+      # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+      # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+      flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed! Please try again later.')
+    finally:
+      db.session.close()
+  else:
+    flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed!')
+    flash(form.errors)
+
+  return render_template('pages/home.html')
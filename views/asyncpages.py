@@ -0,0 +1,247 @@
+#----------------------------------------------------------------------------#
+# Async page routes, served by `uvicorn asgi:app`.
+#
+# /venues, /shows, the venue and artist pages and both searches read through
+# asyncpg (see asyncdb.py): while one request waits on Postgres the worker
+# serves others, and a page's version stamp and its own query are sent at
+# the same time instead of one after the other. The rest is the Flask app's:
+# its hooks, templates, page cache, conditional GET and error pages apply as
+# under WSGI, and every other route (and what these decline: streamed
+# /shows pages, bad input) is the WSGI app itself, run in a thread.
+#
+# Flask's request context is thread-local, so requests interleaved on the
+# event loop would share it. It is only pushed around code that never
+# awaits: once to build the statements, once to render the page.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import time
+
+from flask import current_app, g, render_template, request
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware, build_environ
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException
+
+from asyncdb import PRIMARY, AsyncDatabase, compile_statement
+from cache import page_cache
+from conditional import etag_of, page_salt, revalidate, revalidates
+from models import Venue, Artist, Show
+from pagination import InvalidCursor
+from queries import (artist_detail_query, artist_from_rows, artist_search_query, group_by_area, shows_keyset,
+                     shows_page_query, venue_detail_query, venue_from_rows, venue_search_query, venues_by_area_query)
+from querystats import RequestQueries
+from routing import REPLICA, reads_from_replica
+from views.artists import artist_page, artist_results_page
+from views.common import detail_stamp_query, listing_stamp_query, shows_stamp_query, stamp_of
+from views.shows import shows_args
+from views.venues import venue_page, venue_results_page
+
+
+class Page(object):
+  # What a route reads and how it renders: the rows of `query` go to
+  # render(rows). `stamp` is its version query for conditional GET and `tags`
+  # its page cache tags; routes without them are never revalidated or cached.
+
+  def __init__(self, query, render, stamp=None, tags=None):
+    self.query = query
+    self.render = render
+    self.stamp = stamp
+    self.tags = tags
+
+
+#  Pages
+#  ----------------------------------------------------------------
+#  Built inside the Flask request; None hands the request to the WSGI app.
+
+def venues():
+  return Page(venues_by_area_query(), lambda rows: render_template('pages/venues.html', areas=group_by_area(rows)),
+              stamp=listing_stamp_query(Venue), tags=['venues'])
+
+def show_venue(venue_id):
+  return Page(venue_detail_query(venue_id), lambda rows: venue_page(venue_from_rows(rows)),
+              stamp=detail_stamp_query(Venue, Show.venue_id, Artist, Show.artist_id, venue_id),
+              tags=['venue:%d' % venue_id])
+
+def search_venues():
+  search_term = request.form.get('search_term', '')
+  return Page(venue_search_query(search_term, current_app.config['SEARCH_RESULT_LIMIT']),
+              lambda rows: venue_results_page(rows, search_term))
+
+def show_artist(artist_id):
+  return Page(artist_detail_query(artist_id), lambda rows: artist_page(artist_from_rows(rows)),
+              stamp=detail_stamp_query(Artist, Show.artist_id, Venue, Show.venue_id, artist_id),
+              tags=['artist:%d' % artist_id])
+
+def search_artists():
+  search_term = request.form.get('search_term', '')
+  return Page(artist_search_query(search_term, current_app.config['SEARCH_RESULT_LIMIT']),
+              lambda rows: artist_results_page(rows, search_term))
+
+def shows():
+  when, limit, stream = shows_args()
+  if stream:
+    # streamed pages read their rows while being sent
+    return None
+  return Page(shows_page_query(when, limit, after=request.args.get('after')),
+              lambda rows: render_template('pages/shows.html', shows=shows_keyset(rows, limit), when=when, limit=limit),
+              stamp=shows_stamp_query(), tags=['shows'])
+
+#  Serving
+#  ----------------------------------------------------------------
+
+class AsyncPages(object):
+
+  def __init__(self, flask_app):
+    self.flask_app = flask_app
+    self.wsgi = WSGIMiddleware(flask_app)
+    self.db = AsyncDatabase(flask_app.config)
+    flask_app.extensions['async_db'] = self.db
+
+  def routes(self):
+    return [
+      Route('/venues', self.endpoint(venues), methods=['GET']),
+      Route('/venues/search', self.endpoint(search_venues), methods=['POST']),
+      Route('/venues/{venue_id:int}', self.endpoint(show_venue), methods=['GET']),
+      Route('/artists/search', self.endpoint(search_artists), methods=['POST']),
+      Route('/artists/{artist_id:int}', self.endpoint(show_artist), methods=['GET']),
+      Route('/shows', self.endpoint(shows), methods=['GET']),
+      Mount('', app=self.wsgi),
+    ]
+
+  def endpoint(self, build):
+    async def endpoint(request):
+      return await self.serve(request, build)
+    endpoint.__name__ = build.__name__
+    return endpoint
+
+  async def serve(self, asgi_request, build):
+    started = time.perf_counter()
+    body = await asgi_request.body() if asgi_request.method == 'POST' else b''
+    environ = build_environ(asgi_request.scope, body)
+
+    with self.flask_app.request_context(environ):
+      try:
+        page = build(**asgi_request.path_params)
+      except (HTTPException, InvalidCursor):
+        page = None
+      if page is None:
+        # an ASGI app too; only GETs are declined, their body is still unread
+        return self.wsgi
+
+      bind = REPLICA if reads_from_replica() else PRIMARY
+      statements = {}
+      stamp_statement = None
+      if page.stamp is not None and revalidates():
+        stamp_statement = statements['stamp'] = (compile_statement(page.stamp), bind)
+      stored = None
+      cache = page.tags is not None and page_cache.applies()
+      if cache:
+        stored = page_cache.stored()
+      page_statement = (compile_statement(page.query), bind)
+      # a page read from the replica is only stored when the stamp on the
+      # primary gives the same ETag (see PageCache.storable)
+      check_primary = cache and bind == REPLICA and stamp_statement is not None
+      if stored is None:
+        statements['page'] = page_statement
+        if check_primary:
+          statements['primary_stamp'] = (stamp_statement[0], PRIMARY)
+      salt, full_path = page_salt(), request.full_path
+
+    def etag(rows):
+      return etag_of(stamp_of(rows[0])[0], salt, full_path) if rows else ''
+
+    # the stamp and the page query at once; a 304 the page cache did not
+    # answer costs a wasted page query instead of a second round trip for
+    # every other request
+    queries = RequestQueries(self.flask_app.config['SLOW_QUERIES_LOGGED'])
+    results = await self.fetch_all(statements, queries)
+
+    stamp = results.get('stamp')
+    if stored is not None and not isinstance(stamp, Exception) and stored[0] != etag(stamp):
+      # a stored page is only served under the ETag it was stored with (see
+      # cache.py); one rendered from older data costs the page query after all
+      statements = {'page': page_statement}
+      if check_primary:
+        statements['primary_stamp'] = (stamp_statement[0], PRIMARY)
+      results.update(await self.fetch_all(statements, queries))
+
+    def storable():
+      if not check_primary:
+        return bind == PRIMARY
+      rows = results.get('primary_stamp')
+      return not isinstance(rows, Exception) and etag(rows) == g.get('page_etag', '')
+
+    def render():
+      if cache:
+        # revalidate() has set the ETag compared above
+        cached = page_cache.counted(stored, g.get('page_etag', ''))
+        if cached is not None:
+          return cached
+        if storable():
+          return page_cache.fill(lambda: page.render(results['page']), page.tags)
+      return page.render(results['page'])
+
+    def view():
+      for name in ('stamp', 'page'):
+        if isinstance(results.get(name), Exception):
+          raise results[name]
+      if 'stamp' not in results:
+        return render()
+      rows = results['stamp']
+      return revalidate(stamp_of(rows[0]) if rows else None, render)
+
+    # a new environ, the first request has read the body
+    environ = build_environ(asgi_request.scope, body)
+    with self.flask_app.request_context(environ):
+      # timed from the start, with the statements run above
+      g.request_started = g.metrics_started = started
+      g.request_queries = queries
+      # searches are POSTs but write nothing, they must not make the client sticky
+      g.read_only = True
+      response = self.dispatch(view)
+      return _asgi_response(response, environ)
+
+  async def fetch_all(self, statements, queries):
+    # {name: rows or the exception raised} of {name: (statement, bind)}, sent at once
+    results = await asyncio.gather(
+      *[self.db.fetch(statement, bind, queries) for statement, bind in statements.values()], return_exceptions=True)
+    return dict(zip(statements, results))
+
+  def dispatch(self, view):
+    # view() as the view of the current request, between the app's hooks and
+    # under its error handlers, like Flask.full_dispatch_request()
+    app = self.flask_app
+    try:
+      try:
+        app.try_trigger_before_first_request_functions()
+        rv = app.preprocess_request()
+        if rv is None:
+          rv = view()
+      except Exception as e:
+        rv = app.handle_user_exception(e)
+      return app.finalize_request(rv)
+    except Exception as e:
+      return app.handle_exception(e)
+
+  async def close(self):
+    await self.db.close()
+
+
+def _asgi_response(response, environ):
+  # the Flask response as WSGI would send it: same status, headers and body
+  headers = response.get_wsgi_headers(environ)
+  try:
+    body = b''.join(response.get_app_iter(environ))
+  finally:
+    response.close()
+  asgi_response = Response(body, status_code=response.status_code)
+  asgi_response.raw_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                               for name, value in headers.to_wsgi_list()]
+  return asgi_response
+
+
+def create_asgi_app(flask_app):
+  pages = AsyncPages(flask_app)
+  return Starlette(debug=flask_app.debug, routes=pages.routes(), on_shutdown=[pages.close])
@@ -0,0 +1,100 @@
+#----------------------------------------------------------------------------#
+# Helpers shared by the page blueprints.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timezone
+
+from flask import current_app, stream_with_context
+from sqlalchemy import func
+from werkzeug.local import LocalProxy
+
+from conditional import newest
+from models import db, Venue, Artist, Show
+from suggest import PrefixIndex
+
+#----------------------------------------------------------------------------#
+# Templates.
+#----------------------------------------------------------------------------#
+
+def stream_template(template_name, **context):
+  # like render_template, but yields the page in chunks as it renders
+  app = current_app._get_current_object()
+  app.update_template_context(context)
+  template = app.jinja_env.get_template(template_name)
+  stream = template.stream(context)
+  stream.enable_buffering(app.config['TEMPLATE_STREAM_BUFFER'])
+  return stream_with_context(stream)
+
+#----------------------------------------------------------------------------#
+# Version stamps.
+#
+# One aggregate query per page telling whether it changed; used by
+# @conditional to answer 304 before the page itself is queried. Counting the
+# shows on either side of `now` makes a page change when a show passes.
+#----------------------------------------------------------------------------#
+
+def listing_stamp(model):
+  return lambda: stamp_of(listing_stamp_query(model).one())
+
+def shows_stamp():
+  return stamp_of(shows_stamp_query().one())
+
+def detail_stamp(model, owner_column, other, other_column):
+  def stamp(**view_args):
+    (entity_id,) = view_args.values()
+    row = detail_stamp_query(model, owner_column, other, other_column, entity_id).first()
+    return stamp_of(row) if row is not None else None
+  return stamp
+
+# the statements alone, also run by the ASGI routes (see views/asyncpages.py)
+
+def listing_stamp_query(model):
+  return db.session.query(func.max(model.updated_at), func.count(model.id))
+
+def shows_stamp_query():
+  current_time = datetime.now(timezone.utc)
+  return db.session.query(
+    func.max(Show.updated_at),
+    func.count(Show.id),
+    func.count(Show.id).filter(Show.start_time > current_time),
+    func.max(Show.start_time).filter(Show.start_time <= current_time),
+    db.session.query(func.max(Venue.updated_at)).as_scalar(),
+    db.session.query(func.max(Artist.updated_at)).as_scalar())
+
+def detail_stamp_query(model, owner_column, other, other_column, entity_id):
+  current_time = datetime.now(timezone.utc)
+  return db.session.query(
+    model.updated_at,
+    func.max(Show.updated_at),
+    func.max(other.updated_at),
+    func.count(Show.id),
+    func.count(Show.id).filter(Show.start_time > current_time),
+    func.max(Show.start_time).filter(Show.start_time <= current_time))\
+    .outerjoin(Show, owner_column == model.id)\
+    .outerjoin(other, other.id == other_column)\
+    .filter(model.id == entity_id)\
+    .group_by(model.id)
+
+def stamp_of(row):
+  # the whole row is the version; its datetimes give Last-Modified. They are
+  # compared in UTC, so either database driver yields the same ETag.
+  values = tuple(value.astimezone(timezone.utc) if isinstance(value, datetime) else value for value in row)
+  return values, newest(*[value for value in values if isinstance(value, datetime)])
+
+#----------------------------------------------------------------------------#
+# Suggestions.
+#----------------------------------------------------------------------------#
+
+def _suggestion_rows():
+  for kind, model in (('venue', Venue), ('artist', Artist)):
+    for id, name in db.session.query(model.id, model.name):
+      yield kind, id, name
+
+def init_suggestions(app):
+  # built on the first lookup, rebuilt in the app's context when older than
+  # SUGGEST_MAX_AGE
+  app.extensions['suggestions'] = PrefixIndex(
+    _suggestion_rows, max_age=app.config['SUGGEST_MAX_AGE'], context=app.app_context)
+
+# the current app's index
+suggestions = LocalProxy(lambda: current_app.extensions['suggestions'])
@@ -0,0 +1,59 @@
+#----------------------------------------------------------------------------#
+# Home page, search suggestions, worker stats and error pages.
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, jsonify, render_template, request, url_for
+
+from cache import page_cache
+from pooling import pool_stats
+from routing import engines, replica
+from views.common import suggestions
+
+main = Blueprint('main', __name__)
+
+
+@main.route('/')
+def index():
+  return render_template('pages/home.html')
+
+
+@main.route('/search/suggest')
+@replica
+def search_suggest():
+  # name prefixes for the search boxes, served from memory
+  kind = request.args.get('type')
+  limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+  matches = suggestions.lookup(request.args.get('q', ''), limit=limit, kind=kind)
+
+  return jsonify([{
+    'type': kind,
+    'id': id,
+    'name': name,
+    'url': url_for('venues.show_venue' if kind == 'venue' else 'artists.show_artist', **{kind + '_id': id})
+  } for kind, id, name in matches])
+
+
+@main.route('/_stats/cache')
+def cache_stats():
+  # hit/miss counters of this worker's page cache, for tuning TTL and size
+  return jsonify(page_cache.stats())
+
+@main.route('/_stats/pool')
+def pool_stats_view():
+  # connection pool usage of this worker: checkout waits and saturation
+  pools = engines(current_app)
+  stats = pool_stats(pools.pop('primary'))
+  stats.update((bind, pool_stats(engine)) for bind, engine in pools.items())
+  if 'async_db' in current_app.extensions:
+    # the asyncpg pools of `uvicorn asgi:app` (see asyncdb.py)
+    stats['async'] = current_app.extensions['async_db'].stats()
+  return jsonify(stats)
+
+
+@main.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+@main.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
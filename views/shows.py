@@ -0,0 +1,97 @@
+#----------------------------------------------------------------------------#
+# Show pages.
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, Response, abort, current_app, flash, render_template, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import cached, page_cache
+from conditional import conditional
+from models import db
+from pagination import InvalidCursor
+from queries import SHOW_VIEWS, shows_page
+from routing import replica
+from scheduling import schedule_shows
+from views.common import shows_stamp, stream_template
+
+# forms.py (WTForms, phonenumbers) is imported by the form views themselves,
+# so a worker only loads it once it serves a form
+
+show_pages = Blueprint('shows', __name__)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@show_pages.route('/shows')
+@replica
+@conditional(shows_stamp)
+@cached('shows')
+def shows():
+  # displays list of shows at /shows, one keyset page of (start_time, id) at a time
+  when, limit, stream = shows_args()
+
+  try:
+    page = shows_page(when, limit, after=request.args.get('after'), stream=stream)
+  except InvalidCursor:
+    abort(400)
+
+  context = {'when': when, 'limit': limit}
+  if stream:
+    return Response(stream_template('pages/shows.html', shows=page, **context))
+  return render_template('pages/shows.html', shows=page, **context)
+
+def shows_args():
+  # (when, limit, stream) of a /shows request, also read by the ASGI route
+  # (see views/asyncpages.py); 400 for an unknown view
+  when = request.args.get('when', 'upcoming')
+  if when not in SHOW_VIEWS:
+    abort(400)
+  limit = max(1, min(request.args.get('limit', current_app.config['SHOWS_PER_PAGE'], type=int), current_app.config['SHOWS_MAX_PER_PAGE']))
+  stream = request.args.get('stream', current_app.config['SHOWS_STREAM'], type=int)
+  return when, limit, stream
+
+@show_pages.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@show_pages.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # DONE: insert form data as a new Show record in the db, instead
+  from forms import ShowForm
+  form = ShowForm()
+
+  if form.validate():
+    try:
+      # booked through the scheduler, which rejects overlapping shows
+      (result,) = schedule_shows([{
+        'venue_id': form.venue_id.data,
+        'artist_id': form.artist_id.data,
+        'start_time': form.start_time.data
+      }], current_app.config['SHOW_DURATION']).results
+      db.session.commit()
+
+      if result['status'] == 'created':
+        page_cache.invalidate('venues', 'shows', 'venue:%d' % form.venue_id.data, 'artist:%d' % form.artist_id.data)
+        # on successful db insert, flash success
+        flash('Show was successfully listed!')
+      elif result['status'] == 'conflict':
+        flash('The venue or the artist is already booked at that time. Show could not be listed!')
+      else:
+        flash('An error occurred. Show could not be listed!')
+        flash(result['errors'])
+    except SQLAlchemyError as e:
+      flash('An error occurred. Show could not be listed! Please try again later.')
+    finally:
+      db.session.close()
+  else:
+    # DONE: on unsuccessful db insert, flash an error instead.
+    # e.g., flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    flash('An error occurred. Show could not be listed!')
+    flash(form.errors)
+
+  return render_template('pages/home.html')
@@ -0,0 +1,232 @@
+#----------------------------------------------------------------------------#
+# Venue pages.
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import cached, page_cache
+from conditional import conditional
+from models import db, Venue, Artist, Show
+from queries import venue_detail, venue_search_query, venues_by_area
+from querystats import query_budget
+from routing import replica
+from search import result_count
+from views.common import detail_stamp, listing_stamp, suggestions
+
+# forms.py (WTForms, phonenumbers) is imported by the form views themselves,
+# so a worker only loads it once it serves a form
+
+venue_pages = Blueprint('venues', __name__)
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues')
+@replica
+@conditional(listing_stamp(Venue))
+@cached('venues')
+@query_budget(1)
+def venues():
+  # DONE: replace with real venues data.
+  #       num_shows should be aggregated based on number of upcoming shows per venue.
+
+  # upcoming show counts are read from the materialized counter column
+  data = venues_by_area()
+
+  return render_template('pages/venues.html', areas=data);
+
+@venue_pages.route('/venues/search', methods=['POST'])
+@replica
+@query_budget(1)
+def search_venues():
+  # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  # words are matched as prefixes against name, city, state, genres and description,
+  # a single word also anywhere in the name (see search.py)
+
+  search_term = request.form.get('search_term', '');
+  data = venue_search_query(search_term, current_app.config['SEARCH_RESULT_LIMIT']).all()
+
+  return venue_results_page(data, search_term)
+
+def venue_results_page(data, search_term):
+  # also rendered by the ASGI route (see views/asyncpages.py)
+  response = {
+    'count': result_count(data, current_app.config['SEARCH_RESULT_LIMIT']),
+    'data': data,
+  }
+
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+@venue_pages.route('/venues/<int:venue_id>')
+@replica
+@conditional(detail_stamp(Venue, Show.venue_id, Artist, Show.artist_id))
+@cached('venue:{venue_id}')
+@query_budget(1)
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # DONE: replace with real venue data from the venues table, using venue_id
+
+  # the venue and all of its shows in one round trip
+  return venue_page(venue_detail(venue_id))
+
+def venue_page(venue):
+  # also rendered by the ASGI route (see views/asyncpages.py)
+  if venue is None:
+    return render_template('errors/404.html')
+
+  page_cache.add_tags(*set('artist:%d' % show.artist_id for show in venue.past_shows + venue.upcoming_shows))
+
+  return render_template('pages/show_venue.html', venue=venue)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@venue_pages.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  # DONE: insert form data as a new Venue record in the db, instead
+  # DONE: modify data to be the data object returned from db insertion
+
+  from forms import VenueForm
+  form = VenueForm()
+
+  if form.validate():
+    try:
+      new_venue = Venue(
+        name = request.form['name'],
+        genres = request.form.getlist('genres'),
+        address = request.form['address'],
+        city = request.form['city'],
+        state = request.form['state'],
+        phone = request.form['phone'],
+        website = request.form['website'],
+        facebook_link = request.form['facebook_link'],
+        seeking_talent = bool(request.form['seeking_talent']),
+        seeking_description = request.form['seeking_description'],
+        image_link = request.form['image_link']
+      )
+
+      db.session.add(new_venue)
+      db.session.commit()
+      suggestions.add('venue', new_venue.id, new_venue.name)
+      page_cache.invalidate('venues', 'venue:%d' % new_venue.id)
+
+      # on successful db insert, flash success
+      flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    except SQLAlchemyError as e:
+      # DONE: on unsuccessful db insert, flash an error instead.
+      # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+      # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+      flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed! Please try again later.')
+    finally:
+      db.session.close()
+  else:
+    flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed!')
+    flash(form.errors)
+
+  return render_template('pages/home.html')
+
+@venue_pages.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # DONE: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+  # DONE: insert form data as a new Venue record in the db, instead
+  # DONE: modify data to be the data object returned from db insertion
+
+  message = {}
+
+  try:
+    Venue.query.filter_by(id = venue_id).delete()
+    db.session.commit()
+    suggestions.remove('venue', int(venue_id))
+    page_cache.invalidate('venues', 'shows', 'venue:%d' % int(venue_id))
+
+    message = jsonify({
+      'status': 'success',
+      'message': 'Venue deleted successfully!'
+    })
+  except SQLAlchemyError as e:
+    message = jsonify({
+      'status': 'error',
+      'message': 'An error occurred. Venue could not be delete! Please try again later.'
+    })
+  finally:
+    db.session.close()
+
+  # BONUS CHALLENGE DONE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return message
+
+#  Update
+#  ----------------------------------------------------------------
+
+@venue_pages.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  form = VenueForm()
+  selected_venue = Venue.query.get(venue_id)
+  if not selected_venue:
+    return render_template('errors/404.html')
+
+  form.name.data = selected_venue.name
+  form.genres.data = selected_venue.genres
+  form.address.data = selected_venue.address
+  form.city.data = selected_venue.city
+  form.state.data = selected_venue.state
+  form.phone.data = selected_venue.phone
+  form.website.data = selected_venue.website
+  form.facebook_link.data = selected_venue.facebook_link
+  form.seeking_talent.data = selected_venue.seeking_talent
+  form.seeking_description.data = selected_venue.seeking_description
+  form.image_link.data = selected_venue.image_link
+
+  # DONE: populate form with values from venue with ID <venue_id>
+  return render_template('forms/edit_venue.html', form=form, venue=selected_venue)
+
+@venue_pages.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # DONE: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+
+  from forms import VenueForm
+  form = VenueForm()
+
+  if form.validate():
+    try:
+      venue = Venue.query.get(venue_id)
+      venue.name = request.form['name']
+      venue.genres = request.form.getlist('genres')
+      venue.address = request.form['address']
+      venue.city = request.form['city']
+      venue.state = request.form['state']
+      venue.phone = request.form['phone']
+      venue.website = request.form['website']
+      venue.facebook_link = request.form['facebook_link']
+      venue.seeking_talent = bool(request.form['seeking_talent'])
+      venue.seeking_description = request.form['seeking_description']
+      venue.image_link = request.form['image_link']
+
+      db.session.commit()
+      suggestions.add('venue', venue_id, request.form['name'])
+      page_cache.invalidate('venues', 'shows', 'venue:%d' % venue_id)
+
+      # on successful db update, flash success
+      flash('Venue ' + request.form['name'] + ' was successfully updated!')
+    except SQLAlchemyError as e:
+      # on unsuccessful db update, flash an error instead.
+      flash('An error occurred. Venue ' + request.form['name'] + ' could not be updated! Please try again later.')
+    finally:
+      db.session.close()
+  else:
+    flash('An error occurred. Venue ' + request.form['name'] + ' could not be updated!')
+    flash(form.errors)
+
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))
@@ -0,0 +1,52 @@
+#----------------------------------------------------------------------------#
+# Cold start.
+#
+# Templates are compiled ahead of time into a FileSystemBytecodeCache that
+# every worker loads instead of compiling from source, and a warm-up pass
+# renders the main pages once (templates, database connections, page cache)
+# and builds the search suggestions before a worker takes traffic.
+#----------------------------------------------------------------------------#
+
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def template_cache(directory):
+  os.makedirs(directory, exist_ok=True)
+  return FileSystemBytecodeCache(directory)
+
+
+def compile_templates(app):
+  # compiles every template, which writes it to the bytecode cache when one
+  # is configured; returns the names compiled
+  names = app.jinja_env.list_templates(extensions=['html'])
+  for name in names:
+    app.jinja_env.get_template(name)
+  return names
+
+
+def warm_up(app, urls=None):
+  # loads every template, builds the search suggestions and GETs each url
+  # once; failures are logged, never raised, so a worker still starts when
+  # e.g. the database is not up yet. Returns the seconds spent.
+  started = time.perf_counter()
+  compile_templates(app)
+  suggestions = app.extensions.get('suggestions')
+  if suggestions is not None:
+    try:
+      with app.app_context():
+        suggestions.rebuild()
+    except Exception as e:
+      app.logger.warning('warm-up: building suggestions failed: %s', e)
+  with app.test_client() as client:
+    for url in urls if urls is not None else app.config['WARM_UP_URLS']:
+      try:
+        status = client.get(url).status_code
+      except Exception as e:
+        app.logger.warning('warm-up: GET %s failed: %s', url, e)
+      else:
+        if status >= 500:
+          app.logger.warning('warm-up: GET %s returned %d', url, status)
+  return time.perf_counter() - started